@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+記事スコアリングベンチマーク（従来の入れ子ループ＋全件ソート vs ArticleScorer）
+合成した記事データで上位5件の選別にかかる時間を件数ごとに比較し、選別結果が一致するかも確認
+
+使い方:
+    python benchmarks/bench_article_scoring.py [最大件数]
+"""
+
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from create import Article, ArticleScorer
+
+WORDS = [
+    'AI', '自動化', '効率化', '次世代', 'リリース', '無料', 'ノーコード', 'API', 'ツール', 'プラットフォーム',
+    'サービス', 'アプリ', 'SaaS', 'ダッシュボード', 'エディタ', 'ビルダー', 'Web開発', 'モバイル', 'デザイン',
+    'セキュリティ', 'データ分析', '業務効率化', 'チーム', '管理', '共有', '便利', 'プロダクト', '新機能', '連携', '分析'
+]
+TAGS = ['AI', 'デザイン', 'マーケティング', 'モバイル', 'Web開発', '開発者', 'SaaS', 'Product Research']
+
+
+def build_corpus(count, seed=0):
+    """Peaky Media形式の記事を合成"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    articles = []
+    for i in range(count):
+        published = (now - timedelta(days=rng.randint(0, 60), hours=rng.randint(0, 23))).strftime('%Y-%m-%dT%H:%M:%S')
+        articles.append(Article(
+            title=f"Product{i} – " + ''.join(rng.choices(WORDS, k=4)),
+            link=f"https://peaky.co.jp/product-{i}/",
+            summary='、'.join(rng.choices(WORDS, k=rng.randint(5, 40))),
+            published=published,
+            category='Product Research',
+            tags=rng.sample(TAGS, k=3)
+        ))
+    return articles
+
+
+def legacy_top(articles, count=5):
+    """従来の select_top_articles と同じ入れ子ループのスコアリング＋全件ソート"""
+    def score_article(article):
+        score = 0
+        for keyword in ['AI', '自動化', '効率化', '革新的', '画期的', '次世代', 'リリース', '発表', '最新', '無料',
+                        'オープンソース', 'ノーコード', 'ローコード', 'ブラウザベース', 'API']:
+            if keyword in article.title:
+                score += 2
+        for keyword in ['ツール', 'プラットフォーム', 'サービス', 'アプリ', 'ソフトウェア', 'SaaS', 'ダッシュボード',
+                        'エディタ', 'ジェネレーター', 'ビルダー', 'クリエイター']:
+            if keyword in article.title or keyword in article.summary:
+                score += 1.5
+        for category in ['AI', 'Web開発', 'モバイル', 'デザイン', 'マーケティング', 'セキュリティ', 'データ分析',
+                         '業務効率化', 'コミュニケーション']:
+            if category in article.title or category in ' '.join(article.tags):
+                score += 1
+        try:
+            if article.published:
+                pub_date = datetime.strptime(article.published[:19], '%Y-%m-%dT%H:%M:%S')
+                days_ago = (datetime.now() - pub_date).days
+                if days_ago <= 1:
+                    score += 5
+                elif days_ago <= 7:
+                    score += 3
+                elif days_ago <= 30:
+                    score += 1
+        except ValueError:
+            pass
+        if len(article.summary) > 100:
+            score += 1
+        return score
+
+    scored = [(article, score_article(article)) for article in articles]
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:count]
+
+
+def measure(select, articles):
+    start = time.perf_counter()
+    result = select(articles)
+    return time.perf_counter() - start, result
+
+
+def main():
+    max_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    scorer = ArticleScorer()
+
+    print(f"{'件数':>8} {'従来':>10} {'ArticleScorer':>14} {'倍率':>6}  一致")
+    print("=" * 50)
+    count = 1000
+    while count <= max_count:
+        articles = build_corpus(count)
+        legacy_time, legacy = measure(legacy_top, articles)
+        scorer_time, current = measure(lambda items: scorer.top(items, 5), articles)
+        same = [(a.link, s) for a, s in legacy] == [(a.link, s) for a, s in current]
+        print(f"{count:>8} {legacy_time * 1000:8.1f}ms {scorer_time * 1000:12.1f}ms {legacy_time / scorer_time:5.1f}x  {'✅' if same else '❌'}")
+        count *= 10
+
+
+if __name__ == "__main__":
+    main()
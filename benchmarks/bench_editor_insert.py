@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+本文入力ベンチマーク（タイプ入力 vs 一括挿入）
+ローカルのcontenteditableエディタに記事本文を入力し、入力モードごとの所要時間を比較
+
+使い方:
+    python benchmarks/bench_editor_insert.py [記事ファイル]
+"""
+
+import os
+import sys
+import time
+import glob
+import asyncio
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from main import NoteAutoPoster
+
+# ProseMirror同様にpasteイベントを処理してテキスト・HTMLを挿入する簡易エディタ
+EDITOR_HTML = """
+<div class="ProseMirror" contenteditable="true" style="white-space: pre-wrap"></div>
+<script>
+  const editor = document.querySelector('.ProseMirror');
+  editor.addEventListener('paste', (event) => {
+    event.preventDefault();
+    const html = event.clipboardData.getData('text/html');
+    if (html) {
+      document.execCommand('insertHTML', false, html);
+    } else {
+      document.execCommand('insertText', false, event.clipboardData.getData('text/plain'));
+    }
+  });
+</script>
+"""
+
+
+def load_article(path=None):
+    """ベンチマーク用の記事本文を読み込み"""
+    if path is None:
+        path = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'articles', '*.md')))[-1]
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+async def run_mode(poster, mode, content):
+    """指定モードで本文を入力し、所要時間と結果モードを返す"""
+    await poster.page.set_content(EDITOR_HTML)
+    editor = poster.page.locator('.ProseMirror').first
+    await editor.click()
+    
+    poster.insert_mode = mode
+    start = time.perf_counter()
+    used_mode = await poster._insert_body(editor, content)
+    elapsed = time.perf_counter() - start
+    
+    verified = await poster._verify_editor_content(editor, content)
+    return elapsed, used_mode, verified
+
+
+async def main():
+    content = load_article(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"📄 ベンチマーク記事: {len(content)}文字")
+    
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        poster = NoteAutoPoster()
+        poster.page = await browser.new_page()
+        
+        results = []
+        for mode in ['type', 'insert_text', 'paste', 'html']:
+            elapsed, used_mode, verified = await run_mode(poster, mode, content)
+            results.append((mode, elapsed, used_mode, verified))
+        
+        await browser.close()
+    
+    baseline = results[0][1]
+    print("=" * 50)
+    for mode, elapsed, used_mode, verified in results:
+        mark = "✅" if verified else "❌"
+        print(f"{mark} {mode:<12} {elapsed:8.2f}秒  (x{baseline / elapsed:.1f}, 実行モード: {used_mode})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
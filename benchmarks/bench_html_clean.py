@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+HTML→テキスト変換ベンチマーク（従来の正規表現3パス vs html_to_text）
+大きなcontent:encoded相当のHTMLを変換し、正しさを優先したことによる処理時間の増加を確認
+html_to_textはscript/styleの中身の除去と段落区切りの保持を行う分だけ、従来の3パスより遅い
+
+使い方:
+    python benchmarks/bench_html_clean.py [HTMLファイル] [繰り返し回数]
+
+HTMLファイルを省略した場合は、Peaky Media形式の記事本文（約1MB）を生成して使用
+"""
+
+import os
+import re
+import sys
+import html
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from create import html_to_text
+
+SECTION = (
+    "<h2>プロダクト概要</h2>"
+    "<p>チームのタスク管理と情報共有を一つにまとめる<strong>次世代</strong>のプラットフォーム&#8230;"
+    "<a href=\"https://peaky.co.jp/\">詳しくはこちら</a></p>\n"
+    "<figure class=\"wp-block-image\"><img src=\"https://peaky.co.jp/wp-content/uploads/sample.png\" alt=\"\" />"
+    "<figcaption>管理画面のイメージ</figcaption></figure>\n"
+    "<ul>\n  <li>AIによる要約 &amp; 自動タグ付け</li>\n  <li>ダッシュボード</li>\n  <li>API連携</li>\n</ul>\n"
+    "<script type=\"text/javascript\">window.dataLayer = window.dataLayer || []; gtag('event', 'view');</script>"
+    "<style>.wp-block-image{margin:0 auto}</style>"
+)
+
+
+def regex_clean(content):
+    """従来の実装（エンティティ展開・タグ除去・空白圧縮の3パス）"""
+    if not content:
+        return ""
+    content = html.unescape(content)
+    content = re.sub(r'<[^>]+>', '', content)
+    content = re.sub(r'\s+', ' ', content)
+    return content.strip()
+
+
+def measure(convert, content, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = convert(content)
+        best = min(best, time.perf_counter() - start)
+    return best, text
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] != '-':
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            content = f.read()
+    else:
+        content = SECTION * 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size_mb = len(content.encode('utf-8')) / 1024 / 1024
+
+    print(f"📄 ベンチマークHTML: {size_mb:.2f}MB (繰り返し {repeat}回)")
+
+    results = [
+        ('regex 3パス', *measure(regex_clean, content, repeat)),
+        ('html_to_text', *measure(html_to_text, content, repeat)),
+    ]
+
+    baseline = results[0][1]
+    print("=" * 60)
+    for name, elapsed, text in results:
+        leaked = 'gtag' in text or 'margin' in text
+        mark = "❌" if leaked else "✅"
+        print(f"{mark} {name:<14} {elapsed * 1000:8.1f}ms  (x{baseline / elapsed:.2f}, {size_mb / elapsed:6.1f}MB/秒, "
+              f"出力 {len(text)}文字{'、script/style混入' if leaked else ''})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+RSS解析ベンチマーク（高速パーサー vs feedparser）
+記録済みのPeaky MediaフィードをRSS 2.0高速パーサーとfeedparserで解析し、所要時間とピークメモリを比較
+
+使い方:
+    python benchmarks/bench_rss_parse.py [フィードファイル] [繰り返し回数]
+
+フィードファイルを省略した場合は、Peaky Media形式の記事2000件のフィードを生成して使用
+（記録例: curl -o peaky_feed.xml https://peaky.co.jp/feed/）
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import feedparser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from create import iter_rss_items
+
+ITEM_TEMPLATE = """
+<item>
+  <title>Product{i} – 毎日の作業を効率化するAIツール</title>
+  <link>https://peaky.co.jp/product-{i}/</link>
+  <dc:creator><![CDATA[Peaky Media]]></dc:creator>
+  <pubDate>Mon, 01 Jan 2024 09:00:00 +0000</pubDate>
+  <category><![CDATA[{category}]]></category>
+  <category><![CDATA[AI]]></category>
+  <category><![CDATA[業務効率化]]></category>
+  <guid isPermaLink="false">https://peaky.co.jp/?p={i}</guid>
+  <description><![CDATA[<p>Product{i}は、ブラウザだけで使えるノーコードの自動化ツールです。&#8230;</p>]]></description>
+  <content:encoded><![CDATA[{content}]]></content:encoded>
+</item>"""
+
+CONTENT = (
+    "<h2>概要</h2><p>チームのタスク管理と情報共有を一つにまとめる<strong>次世代</strong>のプラットフォーム。</p>"
+    "<figure><img src=\"https://peaky.co.jp/wp-content/uploads/sample.png\" alt=\"\" /></figure>"
+    "<ul><li>AIによる要約</li><li>ダッシュボード</li><li>API連携</li></ul>"
+) * 8
+
+
+def build_feed(count=2000):
+    """Peaky Media形式のRSS 2.0フィードを生成"""
+    items = ''.join(
+        ITEM_TEMPLATE.format(
+            i=i,
+            category='Product Research' if i % 3 else 'News',
+            content=CONTENT
+        )
+        for i in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        f'<channel><title>Peaky Media</title><link>https://peaky.co.jp</link>{items}</channel></rss>'
+    ).encode('utf-8')
+
+
+def parse_fast(body):
+    return list(iter_rss_items(body))
+
+
+def parse_feedparser(body):
+    return feedparser.parse(body).entries
+
+
+def measure(parse, body, repeat):
+    """最速の所要時間と、1回分の解析のピークメモリ（MB）を返す"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = parse(body)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak / 1024 / 1024, len(items)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] != '-':
+        with open(sys.argv[1], 'rb') as f:
+            body = f.read()
+    else:
+        body = build_feed()
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print(f"📄 ベンチマークフィード: {len(body) / 1024 / 1024:.1f}MB (繰り返し {repeat}回)")
+
+    results = [
+        ('feedparser', *measure(parse_feedparser, body, repeat)),
+        ('iter_rss_items', *measure(parse_fast, body, repeat)),
+    ]
+
+    baseline = results[0][1]
+    print("=" * 60)
+    for name, elapsed, peak, count in results:
+        print(f"{name:<16} {elapsed:8.3f}秒  (x{baseline / elapsed:.1f})  ピークメモリ {peak:7.1f}MB  {count}件")
+
+
+if __name__ == "__main__":
+    main()
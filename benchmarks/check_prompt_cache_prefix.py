@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+プロンプトキャッシュのプレフィックス確認（ローカルのモックAPIサーバーを使用）
+参考記事の異なる2回の記事生成で、送信されたsystemブロックがバイト単位で一致し、
+cache_control付きで、モデルごとのキャッシュ最小トークン数を満たしているかを確認
+
+トークン数はローカルの推定（estimate_tokens）で、実際のトークナイザーとは日本語でずれるため
+最小トークン数の ESTIMATE_MARGIN 倍以上を求める。モックは1回目に cache_creation_input_tokens、
+2回目に cache_read_input_tokens を返し、クライアントがテレメトリに記録することを確認する
+（モックの値なので、実際のAPIでキャッシュされたことの証明にはならない）
+
+使い方:
+    python benchmarks/check_prompt_cache_prefix.py
+"""
+
+import os
+import sys
+import json
+import math
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from create import (
+    ARTICLE_SYSTEM_PROMPT, DEFAULT_MODEL, PROMPT_CACHE_MIN_TOKENS, Article, PeakyArticleGenerator, estimate_tokens
+)
+
+REQUESTS = []
+
+# ローカル推定と実際のトークン数のずれを見込んだ余裕（最小トークン数に対する倍率）
+ESTIMATE_MARGIN = 1.5
+
+
+class MockClaudeHandler(BaseHTTPRequestHandler):
+    """受信したリクエストボディを記録し、固定のテキスト応答を返すモックAPI
+    
+    1回目はsystemをキャッシュに書き込み、2回目以降は読み出したものとしてusageを返す。
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        REQUESTS.append(body)
+        cached = estimate_tokens(ARTICLE_SYSTEM_PROMPT)
+        usage = {"input_tokens": 10, "output_tokens": 5}
+        usage['cache_creation_input_tokens' if len(REQUESTS) == 1 else 'cache_read_input_tokens'] = cached
+        out = json.dumps({
+            "content": [{"type": "text", "text": "# モック記事\n\n本文"}],
+            "usage": usage
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def build_articles(offset):
+    """参考記事を合成（offset ごとに内容が変わる）"""
+    return [
+        Article(
+            title=f"Product{offset + i} – AIでタスクを整理するツール",
+            link=f"https://peaky.co.jp/product-{offset + i}/",
+            summary=f"Product{offset + i}は、ブラウザだけで使える自動化ツールです。" * (i + 1),
+            published='2024-01-01T09:00:00',
+            category='Product Research',
+            tags=['AI', '業務効率化']
+        )
+        for i in range(3)
+    ]
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockClaudeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # 出力ディレクトリ（articles/）とテレメトリはリポジトリを汚さないよう一時ディレクトリに作る
+    os.chdir(tempfile.mkdtemp())
+    telemetry_path = os.path.abspath('telemetry.jsonl')
+    os.environ.update({
+        'ANTHROPIC_API_KEY': 'mock',
+        'ANTHROPIC_BASE_URL': f"http://127.0.0.1:{server.server_address[1]}",
+        'CLAUDE_CACHE': 'false',
+        'CLAUDE_STREAM': 'false',
+        'CLAUDE_TELEMETRY_FILE': telemetry_path,
+    })
+    generator = PeakyArticleGenerator()
+
+    async def generate_twice():
+        for offset in (0, 100):
+            await generator._generate_article_traditional(build_articles(offset))
+
+    asyncio.run(generate_twice())
+    server.shutdown()
+
+    bodies = [json.loads(raw) for raw in REQUESTS]
+    systems = [json.dumps(body.get('system'), ensure_ascii=False, sort_keys=True).encode('utf-8') for body in bodies]
+    prompts = [body['messages'][0]['content'] for body in bodies]
+    tokens = estimate_tokens(ARTICLE_SYSTEM_PROMPT)
+    required = math.ceil(PROMPT_CACHE_MIN_TOKENS[DEFAULT_MODEL] * ESTIMATE_MARGIN)
+    with open(telemetry_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    checks = [
+        ("記事生成リクエストを2回送信", len(bodies) == 2),
+        ("参考記事（user側）は実行ごとに異なる", len(set(prompts)) == 2),
+        ("systemブロックがバイト単位で一致", len(systems) == 2 and systems[0] == systems[1]),
+        ("systemブロックにcache_controlが付いている",
+         all(body.get('system') and body['system'][-1].get('cache_control') == {"type": "ephemeral"} for body in bodies)),
+        (f"system推定 {tokens}トークン ≥ {DEFAULT_MODEL} の最小 {PROMPT_CACHE_MIN_TOKENS[DEFAULT_MODEL]} × {ESTIMATE_MARGIN}"
+         f" = {required}", tokens >= required),
+        ("テレメトリに書き込み→読み出しのキャッシュトークン数を記録",
+         [(r['cache_creation_input_tokens'], r['cache_read_input_tokens']) for r in records] == [(tokens, 0), (0, tokens)]),
+    ]
+
+    print("=" * 60)
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    for model, minimum in PROMPT_CACHE_MIN_TOKENS.items():
+        if tokens < minimum * ESTIMATE_MARGIN:
+            print(f"ℹ️ {model} はキャッシュ最小 {minimum}トークンに推定で余裕がないため、このモデルの応答ではキャッシュされない可能性があります")
+
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
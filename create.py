@@ -5,74 +5,1006 @@ https://peaky.co.jp/feed/ からProduct Researchカテゴリのみを取得し
 """
 
 import os
+import sys
+import time
+import random
+import hashlib
 import asyncio
 import feedparser
-import requests
+import httpx
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import re
+import io
 import json
-from typing import List, Dict
+import math
+from typing import List, Dict, Optional, Tuple, Iterator
 import html
+import heapq
+from email.utils import parsedate_to_datetime
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass, field, asdict
 
 # 環境変数読み込み
 load_dotenv()
 
+def estimate_tokens(text: str) -> int:
+    """トークン数をローカルで概算（日本語などASCII外は1文字≒1トークン、ASCIIは4文字≒1トークン）"""
+    if not text:
+        return 0
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return math.ceil(len(text) - ascii_chars + ascii_chars / 4)
+
+
+def trim_to_tokens(text: str, max_tokens: float) -> str:
+    """推定トークン数が max_tokens に収まるように末尾を切り詰める"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0.0
+    for i, char in enumerate(text):
+        used += 0.25 if char < '\x80' else 1.0
+        if used > max_tokens:
+            return text[:i].rstrip() + "..."
+    return text
+
+
+# Claude API呼び出しのテレメトリ（JSON Lines）の既定の保存先
+DEFAULT_TELEMETRY_FILE = ".cache/telemetry/claude.jsonl"
+
+# 呼び出し箇所（テレメトリの kind）ごとのモデル・最大トークン数・レイテンシ目標（秒）
+# 目標を超えても応答がなければ fallback_model へ並行リクエストし、先に成功した応答を使う
+# kind に一致するキーがなければ「_」より前の部分（article_parallel → article）、それもなければ other を使う
+DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
+FAST_MODEL = "claude-3-5-haiku-20241022"
+MODEL_ROUTES = {
+    'unified': {'model': FAST_MODEL, 'max_tokens': 800, 'latency_target': 15, 'fallback_model': None},
+    'article': {'model': DEFAULT_MODEL, 'max_tokens': 2000, 'latency_target': 60, 'fallback_model': FAST_MODEL},
+    'fanout_product': {'model': DEFAULT_MODEL, 'max_tokens': 700, 'latency_target': 20, 'fallback_model': FAST_MODEL},
+    'fanout_intro': {'model': FAST_MODEL, 'max_tokens': 300, 'latency_target': 10, 'fallback_model': None},
+    'fanout_closing': {'model': FAST_MODEL, 'max_tokens': 300, 'latency_target': 10, 'fallback_model': None},
+    'other': {'model': DEFAULT_MODEL, 'max_tokens': 2000, 'latency_target': None, 'fallback_model': None},
+}
+
+# プロンプトキャッシュが有効になるsystemの最小トークン数（これ未満だと cache_control を付けても何も起きない）
+PROMPT_CACHE_MIN_TOKENS = {DEFAULT_MODEL: 1024, FAST_MODEL: 2048}
+
+# 記事本文生成の静的な指示（実行ごとに変わる記事データは含めない）
+# systemプロンプトとして送りプロンプトキャッシュの対象にするため、1バイトでも変わるとキャッシュが効かなくなる
+# ローカルの推定は日本語で実際のトークン数とずれるため、DEFAULT_MODEL の最小トークン数の1.5倍以上（推定）になるよう
+# 文体の見本・段落の書き方・確認事項まで含めている
+# （FAST_MODEL の最小には届かないため、フォールバックで応答した場合はキャッシュされない）
+# 変更後は benchmarks/check_prompt_cache_prefix.py で長さと同一性を確認する
+ARTICLE_SYSTEM_PROMPT = """あなたはPeaky Mediaのプロダクトリサーチ記事を参考に、Note.com向けの親しみやすいプロダクトまとめ記事を書くライターです。
+ユーザーから参考記事・タイトル・キーワード・ハッシュタグなどの記事データが渡されるので、以下の方針に従ってMarkdownで記事を作成してください。
+
+作成する記事の要件:
+1. タイトル: 記事データで指定された形式・内容
+2. キーワードblockquote: 記事冒頭に、記事データで指定された内容の1-2行コメント
+3. 導入部: 気軽で親しみやすい導入文（100-150文字程度）
+4. 各プロダクト紹介: 参考記事の各プロダクトを200-350文字で親しみやすく紹介
+5. Peaky Mediaリンク: 「公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎」でURL単体配置
+6. 親しみやすい結び: 読者との距離感を縮める呼びかけ
+7. ハッシュタグ: 記事データで指定されたハッシュタグ + プロダクト関連タグ
+
+文体の特徴:
+- 親しみやすく話しかけるような文体
+- 「これは便利そう！」「試してみたくなる」という表現
+- 専門用語を避け、一般の方にも分かりやすく
+- Note読者層に合わせた温かみのある表現
+- プロダクトの魅力を分かりやすく伝える
+
+リンクの埋め込み方（重要）:
+- 詳細記事: URL単体で配置（Note.comが自動でプレビューカードを表示）
+- Peaky Media: 「https://peaky.co.jp/」（URL単体で配置）
+※マークダウンリンクは使わず、URL単体で配置してください
+※「詳しくはこちら：」などの余分なテキストは不要です
+
+記事構成:
+# [タイトル]
+
+> [キーワードblockquote]
+
+親しみやすい導入文
+
+## 1. プロダクト名
+紹介文
+
+URL
+
+...（参考記事の数だけ繰り返し）
+
+## 最後に
+親しみやすい結び + 「公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎」 + Peaky MediaのURL単体配置
+ハッシュタグ
+
+文体の見本（架空のプロダクトです。構成と語り口の参考にとどめ、名前や内容は使わないでください）:
+## 1. TaskNest
+「やることが多すぎて、何から手をつければいいか分からない…」そんな経験、ありませんか？TaskNestは、メモ感覚で書き出したタスクをAIが自動で整理して、今日やるべきことを教えてくれるツールです。
+面白いのは、締め切りや作業時間をいちいち入力しなくても、文章から読み取ってくれるところ。「金曜までに資料」と書くだけで、ちゃんと予定に組み込んでくれます。これは便利そう！
+ブラウザだけで使えて、チームでの共有もワンクリック。まずは無料プランで気軽に試してみたくなりますね。
+
+https://peaky.co.jp/tasknest/
+
+## 最後に
+今回は、毎日の作業をちょっとラクにしてくれるプロダクトを集めてみました。気になるものがあれば、ぜひ触ってみてくださいね。
+公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎
+
+https://peaky.co.jp/
+
+段落と表現の書き方:
+- 1つの段落は2-3文にとどめ、スマートフォンでも読みやすいよう段落の間に空行を入れる
+- 紹介文の書き出しは、読者が共感できる悩みや場面から入り、そのあとでプロダクトを紹介する
+- 機能を並べるだけにせず、「どんな人が」「どんな場面で」助かるのかを具体的に書く
+- 「革命的」「最強」「必須」など、参考記事にない大げさな言い切りは使わない
+- 同じ語尾（「〜です」「〜ます」）が3回以上続かないよう、問いかけや感想を織り交ぜる
+- 絵文字は使わず、感嘆符も1つの紹介文につき1-2回までにする
+- 英語のサービス名や機能名は参考記事の表記をそのまま使い、必要なら短い説明を添える
+- 料金やプランに触れる場合は、参考記事に書かれている範囲だけにとどめる
+- 複数のプロダクトで似た説明が続くときは、それぞれの違いが伝わる一言を加える
+
+出力前の確認事項:
+- 参考記事にない機能・料金・数値を書き足していないか
+- プロダクト名は参考記事の表記どおりか（英語名を勝手にカタカナにしない）
+- 各プロダクトの紹介の直後に、その詳細記事のURLだけの行があるか
+- URLの前後に「詳しくはこちら：」などの文言やマークダウンリンクを付けていないか
+- 見出しの番号が参考記事の順番どおり1から連番になっているか
+- 「最後に」の締めくくりでPeaky MediaのURLを単独の行に置いているか
+- 記事データで指定されたタイトル・blockquote・ハッシュタグを変えていないか
+- 記事の前後に説明文やコードブロックの囲み（```）を付けていないか
+
+Markdownフォーマットで出力してください。"""
+
+class ResponseCache:
+    """Claude応答のディスクキャッシュ（モデル・プロンプト・パラメータのハッシュをキーにする）"""
+    
+    def __init__(self, cache_dir: str, ttl_seconds: float, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(data: Dict) -> str:
+        """リクエスト内容から一意なキーを生成（streamは応答内容に影響しないため除外）"""
+        payload = {k: v for k, v in data.items() if k != 'stream'}
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - entry.get('created', 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                # 並行する呼び出しや _evict がすでに削除している場合
+                pass
+            return None
+        
+        return entry.get('response')
+    
+    def put(self, key: str, model: str, response: str):
+        try:
+            with open(self._path(key), 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'model': model, 'response': response}, f, ensure_ascii=False)
+            self._evict()
+        except OSError as e:
+            print(f"⚠️ キャッシュ書き込み失敗: {e}")
+    
+    def _evict(self):
+        """合計サイズが上限を超えたら古いエントリから削除"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+@dataclass(slots=True)
+class Article:
+    """Product Research記事1件（本文HTMLの整形は選別後まで遅延する）"""
+    title: str
+    link: str
+    summary: str
+    published: str
+    category: str
+    tags: List[str] = field(default_factory=list)
+    raw_content: str = ''
+    content: str = ''
+    score: float = 0.0
+
+
+# select_top_articles のスコアリング設定（PEAKY_SCORING_CONFIG のJSONでキー単位に上書き可能）
+# keyword_rules: fields の記事フィールドに含まれるキーワード1種類ごとに weight を加点
+# recency: 公開から days 日以内なら weight を加点（最初に一致した段階のみ）
+DEFAULT_SCORING_CONFIG = {
+    'keyword_rules': [
+        {
+            # プロダクトの魅力度（特定キーワードでボーナス）
+            'name': 'high_impact', 'fields': ['title'], 'weight': 2.0,
+            'keywords': ['AI', '自動化', '効率化', '革新的', '画期的', '次世代',
+                         'リリース', '発表', '最新', '無料', 'オープンソース',
+                         'ノーコード', 'ローコード', 'ブラウザベース', 'API']
+        },
+        {
+            # プロダクト関連の重要キーワード
+            'name': 'product_priority', 'fields': ['title', 'summary'], 'weight': 1.5,
+            'keywords': ['ツール', 'プラットフォーム', 'サービス', 'アプリ',
+                         'ソフトウェア', 'SaaS', 'ダッシュボード', 'エディタ',
+                         'ジェネレーター', 'ビルダー', 'クリエイター']
+        },
+        {
+            # 技術分野の多様性ボーナス
+            'name': 'tech_category', 'fields': ['title', 'tags'], 'weight': 1.0,
+            'keywords': ['AI', 'Web開発', 'モバイル', 'デザイン', 'マーケティング',
+                         'セキュリティ', 'データ分析', '業務効率化', 'コミュニケーション']
+        }
+    ],
+    # 記事の新しさ（最近の記事を優遇）
+    'recency': [{'days': 1, 'weight': 5.0}, {'days': 7, 'weight': 3.0}, {'days': 30, 'weight': 1.0}],
+    # 要約の充実度
+    'summary_bonus': {'min_length': 100, 'weight': 1.0}
+}
+
+
+class ArticleScorer:
+    """設定テーブルに基づいて記事をまとめてスコアリングし、上位を選ぶ
+    
+    キーワード表はルールごとに1つの正規表現にまとめてコンパイルし、
+    スコアは記事ごとではなくルール（列）ごとに全記事分をまとめて計算して重み付きで合算する。
+    """
+    
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**DEFAULT_SCORING_CONFIG, **(config or {})}
+        self.rules = []
+        for rule in self.config['keyword_rules']:
+            # 出現が重なりうるキーワードがなければ1つの正規表現でまとめて照合する。
+            # 重なりうる場合（「ソフトウェア」と「アプリ」のように一方の末尾と他方の先頭が一致するなど）は
+            # 正規表現では一方しか拾えないため、キーワードごとの部分文字列判定にする
+            keywords = sorted(set(rule['keywords']), key=len, reverse=True)
+            if self._keywords_overlap(keywords):
+                matcher = keywords
+            else:
+                matcher = re.compile('|'.join(map(re.escape, keywords)))
+            self.rules.append((matcher, rule['fields'], float(rule['weight'])))
+        self.recency = sorted(self.config['recency'], key=lambda tier: tier['days'])
+    
+    @staticmethod
+    def _keywords_overlap(keywords: List[str]) -> bool:
+        """どれか2つのキーワードの出現が文中で重なりうるか（包含、または末尾と先頭の一致）"""
+        for a in keywords:
+            for b in keywords:
+                if a == b:
+                    continue
+                if b in a or any(a.endswith(b[:k]) for k in range(1, min(len(a), len(b)))):
+                    return True
+        return False
+    
+    @staticmethod
+    def _count_keywords(matcher, text: str) -> int:
+        """テキストに含まれるキーワードの種類数"""
+        if isinstance(matcher, list):
+            return sum(1 for keyword in matcher if keyword in text)
+        return len(set(matcher.findall(text)))
+    
+    @staticmethod
+    def _field_text(article: Article, fields: List[str]) -> str:
+        if len(fields) == 1 and fields[0] != 'tags':
+            return getattr(article, fields[0])
+        return '\n'.join(' '.join(article.tags) if name == 'tags' else getattr(article, name) for name in fields)
+    
+    @staticmethod
+    def parse_published(published: str) -> Optional[datetime]:
+        """公開日時（RSSのRFC 822形式・ISO 8601形式）をローカル時刻のnaiveなdatetimeにする"""
+        if not published:
+            return None
+        try:
+            parsed = datetime.fromisoformat(published)
+        except ValueError:
+            try:
+                parsed = parsedate_to_datetime(published)
+            except (TypeError, ValueError):
+                return None
+        return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+    
+    def score_all(self, articles: List[Article], now: Optional[datetime] = None) -> List[float]:
+        """全記事のスコアを記事順のリストで返す"""
+        scores = [0.0] * len(articles)
+        
+        for matcher, fields, weight in self.rules:
+            # キーワードの種類数 × 重み（同じキーワードの複数回出現は1回と数える）
+            column = [self._count_keywords(matcher, self._field_text(article, fields)) for article in articles]
+            scores = [score + weight * hits for score, hits in zip(scores, column)]
+        
+        now = now or datetime.now()
+        day_cache = {}
+        recency_column = []
+        for article in articles:
+            if article.published not in day_cache:
+                published = self.parse_published(article.published)
+                bonus = 0.0
+                if published is not None:
+                    days_ago = (now - published).days
+                    bonus = next((tier['weight'] for tier in self.recency if days_ago <= tier['days']), 0.0)
+                day_cache[article.published] = bonus
+            recency_column.append(day_cache[article.published])
+        scores = [score + bonus for score, bonus in zip(scores, recency_column)]
+        
+        summary_bonus = self.config['summary_bonus']
+        return [
+            score + (summary_bonus['weight'] if len(article.summary) > summary_bonus['min_length'] else 0.0)
+            for score, article in zip(scores, articles)
+        ]
+    
+    def top(self, articles: List[Article], count: int) -> List[Tuple[Article, float]]:
+        """スコア上位 count 件を (記事, スコア) で返す（全件ソートせず上位だけをヒープで選ぶ、同点は元の順）"""
+        scores = self.score_all(articles)
+        indices = heapq.nlargest(count, range(len(articles)), key=scores.__getitem__)
+        return [(articles[i], scores[i]) for i in indices]
+
+
+# 属性値の中の「>」で途切れないタグ本体（引用符の外側を一気に読み飛ばす）
+HTML_ATTRS = r"""[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*"""
+# 中身ごと捨てる非コンテンツ要素と、段落（空行）・改行で区切る要素
+HTML_SKIP_TAGS = 'script|style|noscript|template|svg|iframe|head|object'
+HTML_BLOCK_TAGS = (
+    'p|div|section|article|header|footer|aside|main|nav|h[1-6]|ul|ol|dl|blockquote|pre|'
+    'figure|figcaption|table|hr'
+)
+HTML_LINE_TAGS = 'br|li|dt|dd|tr'
+# タグ名の大文字小文字は混在しうる（<sCript> など）ため常に大文字小文字を区別しない
+HTML_SKIP_RE = re.compile(
+    rf'<({HTML_SKIP_TAGS})\b{HTML_ATTRS}(?<!/)>.*?(?:</\1\s*>|$)|<!--.*?(?:-->|$)',
+    re.IGNORECASE | re.DOTALL
+)
+HTML_BLOCK_RE = re.compile(rf'</?(?:{HTML_BLOCK_TAGS})\b{HTML_ATTRS}>', re.IGNORECASE)
+HTML_LINE_RE = re.compile(rf'</?(?:{HTML_LINE_TAGS})\b{HTML_ATTRS}>', re.IGNORECASE)
+HTML_TAG_RE = re.compile(rf'<[a-zA-Z/!?]{HTML_ATTRS}>')
+# 段落・改行の目印（\x00, \x01）を含む空白の連なり
+HTML_SEPARATOR_RE = re.compile(r'[\s\x00\x01]+')
+
+
+def _html_separator(match: re.Match) -> str:
+    """空白の連なりを段落区切り・改行・空白1つのいずれかにまとめる"""
+    run = match.group(0)
+    if '\x00' in run:
+        return '\n\n'
+    if '\x01' in run:
+        return '\n'
+    return ' '
+
+
+def html_to_text(content: str) -> str:
+    """HTMLをテキストに変換する
+    
+    段落要素の境界は空行、改行要素は改行にし、script/style等は中身ごと捨てる。
+    エンティティはタグを除いた後に展開するため、「&lt;tag&gt;」のような本文は残る。
+    """
+    if not content:
+        return ""
+    if '<' not in content and '&' not in content:
+        return ' '.join(content.split())
+    
+    content = HTML_SKIP_RE.sub('', content)
+    content = HTML_BLOCK_RE.sub('\x00', content)
+    content = HTML_LINE_RE.sub('\x01', content)
+    content = HTML_TAG_RE.sub('', content)
+    if '&' in content:
+        content = html.unescape(content)
+    return HTML_SEPARATOR_RE.sub(_html_separator, content).strip()
+
+
+CONTENT_ENCODED_TAG = '{http://purl.org/rss/1.0/modules/content/}encoded'
+
+
+def iter_rss_items(body: bytes) -> Iterator[Dict]:
+    """RSS 2.0 を逐次解析し、item ごとに必要なフィールドだけを返す（高速パス）
+    
+    整形式でないXMLやRSS 2.0以外（Atom等）の場合は ET.ParseError を送出する。
+    """
+    parser = ET.iterparse(io.BytesIO(body), events=('start', 'end'))
+    _, root = next(parser)
+    if root.tag != 'rss':
+        raise ET.ParseError(f"RSS 2.0ではありません: <{root.tag}>")
+    
+    channel = None
+    for event, element in parser:
+        if event == 'start':
+            if element.tag == 'channel':
+                channel = element
+            continue
+        if element.tag != 'item':
+            continue
+        
+        categories = [(category.text or '').strip() for category in element.findall('category')]
+        yield {
+            'title': (element.findtext('title') or '').strip(),
+            'link': (element.findtext('link') or '').strip(),
+            'summary': element.findtext('description') or '',
+            'published': (element.findtext('pubDate') or '').strip(),
+            'category': categories[0] if categories else '',
+            'tags': categories,
+            'content': element.findtext(CONTENT_ENCODED_TAG) or ''
+        }
+        # 解析済みのitemをツリーから外してメモリ使用量を一定に保つ
+        if channel is not None:
+            channel.remove(element)
+
+
+class FeedTooLargeError(Exception):
+    """RSSフィードのサイズが上限を超えた"""
+
+
+class FeedFetcher:
+    """RSSフィードの取得（タイムアウト・サイズ上限・ETag/Last-Modifiedによる条件付きGET）
+    
+    取得・抽出した記事はディスクにキャッシュし、304 Not Modified の場合は解析せずに再利用する。
+    """
+    
+    def __init__(self, cache_dir: str, timeout: float = 15.0, max_bytes: int = 5 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest()[:16] + '.json')
+    
+    def load(self, url: str) -> Optional[Dict]:
+        """キャッシュ済みの取得結果（検証用ヘッダーと記事）を返す"""
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    
+    def save(self, url: str, validators: Dict, payload: Dict):
+        """検証用ヘッダーと抽出済みの記事をキャッシュに保存"""
+        record = {'url': url, 'fetched_at': time.time(), **validators, **payload}
+        tmp_path = self._path(url) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(url))
+    
+    async def fetch(self, url: str, cached: Optional[Dict]) -> Tuple[Optional[bytes], Dict]:
+        """フィードを取得し (本文, 検証用ヘッダー) を返す（304の場合は本文None）
+        
+        timeout は接続から受信完了までの合計時間の上限、max_bytes は受信サイズの上限。
+        """
+        headers = {'User-Agent': 'note-ai-feed-fetcher/1.0'}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        # httpxのtimeoutは読み取り1回ごとの上限なので、少しずつ届くフィードでも止まるよう全体を打ち切る
+        try:
+            return await asyncio.wait_for(self._fetch(url, headers), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout(f"フィード取得が{self.timeout:.0f}秒以内に完了しませんでした") from None
+    
+    async def _fetch(self, url: str, headers: Dict) -> Tuple[Optional[bytes], Dict]:
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            async with client.stream('GET', url, headers=headers) as response:
+                if response.status_code == 304:
+                    return None, {}
+                response.raise_for_status()
+                
+                length = response.headers.get('content-length')
+                if length and length.isdigit() and int(length) > self.max_bytes:
+                    raise FeedTooLargeError(f"フィードサイズが上限を超えています: {int(length)}バイト")
+                
+                chunks = []
+                received = 0
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise FeedTooLargeError(f"フィードサイズが上限 {self.max_bytes}バイトを超えました")
+                    chunks.append(chunk)
+                
+                validators = {
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified'),
+                    'content_type': response.headers.get('content-type')
+                }
+                return b''.join(chunks), validators
+
+
+class ClaudeClient:
+    """Claude Messages APIの共有非同期クライアント（keep-aliveコネクションプール）
+    
+    一時的なエラー（429/529/5xx・通信エラー・タイムアウト）はジッター付き指数バックオフでリトライし、
+    retry-afterヘッダーがあればそれに従う。失敗が続いた場合はサーキットブレーカーを開き、
+    一定時間API呼び出しを即座にスキップしてテンプレート記事へのフォールバックを早める。
+    ストリーミング（SSE）モードでは全体のタイムアウトではなくチャンク間の無通信時間で打ち切る。
+    tool を渡すとそのツールの呼び出しを強制し、ツール入力をJSON文字列として返す。
+    system を渡すとプロンプトキャッシュ対象のsystemプロンプトとして送信する。
+    telemetry_path を指定すると、呼び出しごとの種別・トークン数・レイテンシ等をJSON Linesで追記する。
+    """
+    
+    API_URL = "https://api.anthropic.com/v1/messages"
+    DEFAULT_MODEL = DEFAULT_MODEL
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+    
+    def __init__(self, api_key: str, timeout: float = 30.0, max_retries: int = 2,
+                 backoff_base: float = 1.0, backoff_max: float = 8.0, max_retry_wait: float = 20.0,
+                 breaker_threshold: int = 3, breaker_cooldown: float = 120.0,
+                 stream_idle_timeout: float = 30.0, cache: Optional[ResponseCache] = None,
+                 base_url: Optional[str] = None, telemetry_path: Optional[str] = None):
+        # base_url を指定するとAPIの送信先を差し替える（ローカルのモックサーバーでの検証用）
+        self.api_url = f"{base_url.rstrip('/')}/v1/messages" if base_url else self.API_URL
+        self.cache = cache
+        self.telemetry_path = telemetry_path
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_wait = max_retry_wait
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+        # ストリーミング時のreadタイムアウト = チャンク間のアイドルタイムアウト
+        self._stream_timeout = httpx.Timeout(timeout, read=stream_idle_timeout)
+        
+        self._client = httpx.AsyncClient(
+            headers={
+                "Content-Type": "application/json",
+                "x-api-key": api_key,
+                "anthropic-version": "2023-06-01"
+            },
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+        )
+    
+    def is_available(self) -> bool:
+        """サーキットブレーカーが閉じている（API呼び出し可能）か"""
+        return time.monotonic() >= self._breaker_open_until
+    
+    def _open_breaker(self):
+        self._breaker_open_until = time.monotonic() + self.breaker_cooldown
+        print(f"🔌 サーキットブレーカー作動: {self.breaker_cooldown:.0f}秒間Claude API呼び出しをスキップします")
+    
+    def _record_failure(self):
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.breaker_threshold:
+            self._open_breaker()
+    
+    def _record_success(self):
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+    
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """ジッター付き指数バックオフ（retry-afterヘッダーを優先）"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        
+        return delay
+    
+    @staticmethod
+    def _log_prompt_cache(usage: Dict):
+        """プロンプトキャッシュの書き込み・読み出しトークン数を表示"""
+        created = usage.get('cache_creation_input_tokens') or 0
+        read = usage.get('cache_read_input_tokens') or 0
+        if created or read:
+            print(f"🗂️ プロンプトキャッシュ: 読み出し {read} / 書き込み {created} トークン")
+    
+    @staticmethod
+    def estimate_input_tokens(data: Dict) -> int:
+        """リクエストの入力トークン数を概算（system・メッセージ・ツール定義の合計）"""
+        total = sum(estimate_tokens(block['text']) for block in data.get('system', []))
+        total += sum(estimate_tokens(message['content']) for message in data['messages'])
+        if data.get('tools'):
+            total += estimate_tokens(json.dumps(data['tools'], ensure_ascii=False))
+        return total
+    
+    @staticmethod
+    def _log_usage(estimated: int, usage: Dict):
+        """推定入力トークン数と実際のusageを比較して表示"""
+        actual = (usage.get('input_tokens') or 0) + (usage.get('cache_creation_input_tokens') or 0) \
+            + (usage.get('cache_read_input_tokens') or 0)
+        if not actual:
+            return
+        error = (estimated - actual) / actual * 100
+        print(f"📏 入力トークン: 推定 {estimated} / 実際 {actual} (誤差 {error:+.0f}%)、出力 {usage.get('output_tokens', 0)}")
+    
+    async def _send(self, data: Dict, progress_path: Optional[str], metrics: Dict):
+        """リクエストを送信し (レスポンス, 応答テキスト) を返す（200以外はテキストNone）
+        
+        usage・最初のバイトまでの時間（TTFB）・最初のトークンまでの時間（TTFT）は metrics に記録する。
+        """
+        start = time.monotonic()
+        timeout = self._stream_timeout if data.get('stream') else httpx.USE_CLIENT_DEFAULT
+        async with self._client.stream("POST", self.api_url, json=data, timeout=timeout) as response:
+            metrics['ttfb'] = time.monotonic() - start
+            if response.status_code != 200:
+                await response.aread()
+                return response, None
+            if data.get('stream'):
+                return response, await self._read_event_stream(response, progress_path, metrics)
+            
+            payload = json.loads(await response.aread())
+            metrics['usage'].update(payload.get('usage', {}))
+            self._log_prompt_cache(metrics['usage'])
+            content = payload['content']
+            # ツール呼び出しがあればその入力（スキーマに沿ったJSON）を返す
+            tool_input = next((block['input'] for block in content if block.get('type') == 'tool_use'), None)
+            if tool_input is not None:
+                return response, json.dumps(tool_input, ensure_ascii=False)
+            return response, content[0]['text']
+    
+    async def _read_event_stream(self, response: httpx.Response, progress_path: Optional[str],
+                                 metrics: Dict) -> str:
+        """SSEを読み取り、届いたトークンを進行中ファイルに書き出す（usage・TTFTは metrics に記録）"""
+        start = time.monotonic()
+        first_token_at = None
+        chunks = []
+        progress = open(progress_path, 'w', encoding='utf-8') if progress_path else None
+        
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                
+                event = json.loads(line[5:].strip())
+                if event.get('type') == 'message_start':
+                    metrics['usage'].update(event.get('message', {}).get('usage', {}))
+                    self._log_prompt_cache(metrics['usage'])
+                elif event.get('type') == 'message_delta':
+                    metrics['usage'].update(event.get('usage', {}))
+                if event.get('type') == 'error':
+                    # overloaded_error等はストリーム途中でも通信エラーとしてリトライ対象にする
+                    raise httpx.RemoteProtocolError(f"ストリーミングエラー: {event.get('error')}")
+                
+                if event.get('type') != 'content_block_delta' or event['delta'].get('type') != 'text_delta':
+                    continue
+                
+                text = event['delta']['text']
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                    metrics['ttft'] = metrics['ttfb'] + first_token_at - start
+                    print(f"⚡ 最初のトークン受信 (TTFT: {first_token_at - start:.2f}秒)")
+                
+                chunks.append(text)
+                if progress:
+                    progress.write(text)
+                    progress.flush()
+        finally:
+            if progress:
+                progress.close()
+        
+        content = ''.join(chunks)
+        print(f"✅ ストリーミング受信完了: {len(content)}文字 ({time.monotonic() - start:.1f}秒)")
+        return content
+    
+    async def create_message(self, prompt: str, max_tokens: int = 2000, stream: bool = False,
+                             progress_path: Optional[str] = None, tool: Optional[Dict] = None,
+                             system: Optional[str] = None, kind: str = "other",
+                             model: Optional[str] = None) -> Optional[str]:
+        """プロンプトを送信して応答テキストを返す（失敗時はNone）
+        
+        stream=True の場合はSSEで受信し、progress_path に受信済みテキストを逐次書き出す。
+        tool を指定した場合はツール呼び出しを強制し、ツール入力のJSON文字列を返す（ストリーミング不可）。
+        system は cache_control 付きで送り、実行間で同一ならプロバイダー側のプロンプトキャッシュが効く。
+        kind はテレメトリで呼び出し箇所（プロンプトの種類）を区別するためのラベル。
+        model を省略した場合は DEFAULT_MODEL を使う。
+        """
+        data = {
+            "model": model or self.DEFAULT_MODEL,
+            "max_tokens": max_tokens,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        if system:
+            data["system"] = [
+                {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}
+            ]
+        if tool:
+            data["tools"] = [tool]
+            data["tool_choice"] = {"type": "tool", "name": tool["name"]}
+        elif stream:
+            data["stream"] = True
+        
+        metrics = {
+            'kind': kind, 'model': data["model"], 'stream': bool(data.get("stream")), 'status': None,
+            'retries': 0, 'ttfb': None, 'ttft': None, 'usage': {},
+            'estimated_input_tokens': self.estimate_input_tokens(data)
+        }
+        start = time.monotonic()
+        try:
+            return await self._create_message(data, progress_path, metrics)
+        except asyncio.CancelledError:
+            # レイテンシ目標超過時のフォールバックに負けて打ち切られた場合
+            metrics['status'] = 'cancelled'
+            raise
+        finally:
+            self._write_telemetry(metrics, time.monotonic() - start)
+    
+    async def _create_message(self, data: Dict, progress_path: Optional[str], metrics: Dict) -> Optional[str]:
+        """ブレーカー・キャッシュ確認とリトライ付きの送信（結果は metrics に記録）"""
+        if not self.is_available():
+            print("🔌 サーキットブレーカー作動中のためClaude API呼び出しをスキップ")
+            metrics['status'] = 'breaker_open'
+            return None
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(data)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"💾 キャッシュヒット: {cache_key[:12]}")
+                metrics['status'] = 'cache_hit'
+                return cached
+            print(f"💾 キャッシュミス: {cache_key[:12]}")
+        
+        attempts = self.max_retries + 1
+        for attempt in range(attempts):
+            response = None
+            metrics['retries'] = attempt
+            try:
+                response, text = await self._send(data, progress_path, metrics)
+                metrics['status'] = response.status_code
+                
+                if response.status_code == 401:
+                    print("❌ 認証エラー: APIキーが無効です")
+                    self._open_breaker()
+                    return None
+                elif response.status_code == 404:
+                    print("❌ エンドポイントが見つかりません")
+                    return None
+                
+                if response.status_code in self.RETRYABLE_STATUS:
+                    print(f"⚠️ Claude API一時エラー (status: {response.status_code}, 試行 {attempt + 1}/{attempts})")
+                    self._record_failure()
+                else:
+                    response.raise_for_status()
+                    self._record_success()
+                    self._log_usage(metrics['estimated_input_tokens'], metrics['usage'])
+                    if cache_key is not None:
+                        self.cache.put(cache_key, data["model"], text)
+                    return text
+                
+            except httpx.TimeoutException as e:
+                # タイムアウト（ストリーミング時は無通信）も通信エラーと同様に失敗として数えてリトライする
+                print(f"⚠️ APIタイムアウト (試行 {attempt + 1}/{attempts}): {e!r}")
+                metrics['status'] = 'timeout'
+                self._record_failure()
+            except httpx.TransportError as e:
+                print(f"⚠️ API通信エラー (試行 {attempt + 1}/{attempts}): {e}")
+                metrics['status'] = 'transport_error'
+                self._record_failure()
+            except httpx.HTTPError as e:
+                print(f"❌ API通信エラー: {e}")
+                return None
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"❌ APIレスポンス解析エラー: {e}")
+                metrics['status'] = 'parse_error'
+                return None
+            
+            if attempt == attempts - 1 or not self.is_available():
+                break
+            
+            delay = self._retry_delay(attempt, response)
+            if delay > self.max_retry_wait:
+                print(f"⚠️ 待機時間が長すぎるためリトライを中止します (retry-after: {delay:.0f}秒)")
+                self._open_breaker()
+                break
+            
+            print(f"⏳ {delay:.1f}秒後にリトライします...")
+            await asyncio.sleep(delay)
+        
+        print("❌ Claude API呼び出しに失敗しました")
+        return None
+    
+    def _write_telemetry(self, metrics: Dict, latency: float):
+        """呼び出し1件分のテレメトリをJSON Linesで追記"""
+        if not self.telemetry_path:
+            return
+        
+        usage = metrics['usage']
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'kind': metrics['kind'],
+            'model': metrics['model'],
+            'stream': metrics['stream'],
+            'status': metrics['status'],
+            'retries': metrics['retries'],
+            'latency': round(latency, 3),
+            'ttfb': round(metrics['ttfb'], 3) if metrics['ttfb'] is not None else None,
+            'ttft': round(metrics['ttft'], 3) if metrics['ttft'] is not None else None,
+            'estimated_input_tokens': metrics['estimated_input_tokens'],
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0),
+            'cache_read_input_tokens': usage.get('cache_read_input_tokens') or 0,
+            'cache_creation_input_tokens': usage.get('cache_creation_input_tokens') or 0
+        }
+        try:
+            os.makedirs(os.path.dirname(self.telemetry_path) or '.', exist_ok=True)
+            with open(self.telemetry_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"⚠️ テレメトリ書き込みエラー: {e}")
+    
+    async def aclose(self):
+        """コネクションプールを閉じる"""
+        await self._client.aclose()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def print_telemetry_report(path: str):
+    """テレメトリログをプロンプト種別ごとに集計して表示（レイテンシ p50/p95・累計トークン数）"""
+    if not os.path.exists(path):
+        print(f"📭 テレメトリログがありません: {path}")
+        return
+    
+    stats = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entry = stats.setdefault(record.get('kind', 'other'), {
+                'calls': 0, 'errors': 0, 'cache_hits': 0, 'retries': 0,
+                'latency': [], 'ttfb': [], 'input_tokens': 0, 'output_tokens': 0
+            })
+            entry['calls'] += 1
+            entry['retries'] += record.get('retries') or 0
+            status = record.get('status')
+            if status == 'cache_hit':
+                entry['cache_hits'] += 1
+                continue
+            if status not in (200, 'cancelled'):
+                entry['errors'] += 1
+            if isinstance(status, int):
+                entry['latency'].append(record['latency'])
+                if record.get('ttfb') is not None:
+                    entry['ttfb'].append(record['ttfb'])
+            entry['input_tokens'] += (record.get('input_tokens') or 0) + (record.get('cache_read_input_tokens') or 0) \
+                + (record.get('cache_creation_input_tokens') or 0)
+            entry['output_tokens'] += record.get('output_tokens') or 0
+    
+    print(f"📊 Claude APIテレメトリ: {path}")
+    print(f"{'種別':<20}{'件数':>6}{'失敗':>6}{'キャッシュ':>6}{'リトライ':>6}{'p50(秒)':>9}{'p95(秒)':>9}{'TTFB p50':>10}{'入力tok':>10}{'出力tok':>10}")
+    for kind, entry in sorted(stats.items()):
+        p50 = f"{_percentile(entry['latency'], 50):.2f}" if entry['latency'] else '-'
+        p95 = f"{_percentile(entry['latency'], 95):.2f}" if entry['latency'] else '-'
+        ttfb = f"{_percentile(entry['ttfb'], 50):.2f}" if entry['ttfb'] else '-'
+        print(f"{kind:<20}{entry['calls']:>6}{entry['errors']:>6}{entry['cache_hits']:>6}{entry['retries']:>6}"
+              f"{p50:>9}{p95:>9}{ttfb:>10}{entry['input_tokens']:>10}{entry['output_tokens']:>10}")
+
+
 class PeakyArticleGenerator:
     def __init__(self):
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
         if not self.anthropic_api_key:
             raise ValueError("ANTHROPIC_API_KEY環境変数を設定してください")
         
+        # Claude API呼び出しは共有クライアントで接続を再利用（応答はディスクにキャッシュ）
+        cache = None
+        if os.getenv('CLAUDE_CACHE', 'true').lower() != 'false':
+            cache = ResponseCache(
+                os.getenv('CLAUDE_CACHE_DIR', '.cache/claude'),
+                ttl_seconds=float(os.getenv('CLAUDE_CACHE_TTL_HOURS', '24')) * 3600,
+                max_bytes=int(float(os.getenv('CLAUDE_CACHE_MAX_MB', '50')) * 1024 * 1024)
+            )
+        self.claude = ClaudeClient(self.anthropic_api_key, cache=cache,
+                                   base_url=os.getenv('ANTHROPIC_BASE_URL'),
+                                   telemetry_path=os.getenv('CLAUDE_TELEMETRY_FILE', DEFAULT_TELEMETRY_FILE) or None)
+        # 記事本文をストリーミングで受信するか（受信中の本文は progress_path に書き出す）
+        self.stream_enabled = os.getenv('CLAUDE_STREAM', 'true').lower() != 'false'
+        # 統合コンテンツ生成と記事本文生成を並行実行するか（本文はプレースホルダー付きで生成し後で差し替える）
+        self.parallel_enabled = os.getenv('CLAUDE_PARALLEL', 'true').lower() != 'false'
+        # プロダクトごと・導入・結びを個別リクエストで並行生成するか（同時実行数は fanout_concurrency まで）
+        self.fanout_enabled = os.getenv('CLAUDE_FANOUT', 'false').lower() == 'true'
+        self.fanout_concurrency = max(1, int(os.getenv('CLAUDE_FANOUT_CONCURRENCY', '3')))
+        
         self.peaky_feed_url = "https://peaky.co.jp/feed/"
+        # 記事選別のスコアリング設定（PEAKY_SCORING_CONFIG にJSONファイルを指定すると上書き）
+        scoring_config = None
+        if os.getenv('PEAKY_SCORING_CONFIG'):
+            with open(os.getenv('PEAKY_SCORING_CONFIG'), 'r', encoding='utf-8') as f:
+                scoring_config = json.load(f)
+        self.scorer = ArticleScorer(scoring_config)
+        # RSSフィードは条件付きGETで取得し、変更がなければキャッシュ済みの記事を使う
+        self.feed_fetcher = FeedFetcher(
+            os.getenv('PEAKY_FEED_CACHE_DIR', '.cache/feed'),
+            timeout=float(os.getenv('PEAKY_FEED_TIMEOUT', '15')),
+            max_bytes=int(float(os.getenv('PEAKY_FEED_MAX_MB', '5')) * 1024 * 1024)
+        )
         self.output_dir = "articles"
+        self.progress_path = os.path.join(self.output_dir, "generating.md.part")
+        # 呼び出し箇所ごとのモデルルーティング（CLAUDE_MODEL_ROUTES にJSONで部分的に上書き可能）
+        self.model_routes = {kind: dict(route) for kind, route in MODEL_ROUTES.items()}
+        try:
+            for kind, route in json.loads(os.getenv('CLAUDE_MODEL_ROUTES') or '{}').items():
+                self.model_routes.setdefault(kind, dict(MODEL_ROUTES['other'])).update(route)
+        except (ValueError, AttributeError, TypeError) as e:
+            print(f"⚠️ CLAUDE_MODEL_ROUTES を解釈できないため既定のルーティングを使用: {e}")
+            self.model_routes = {kind: dict(route) for kind, route in MODEL_ROUTES.items()}
+        # レイテンシ目標を超えた呼び出し箇所（以降はこの実行中ずっと fallback_model を使う）
+        self.slow_kinds = set()
+        # 参考記事データに割り当てる入力トークン予算（記事本文プロンプト・統合生成プロンプト）
+        self.article_input_budget = int(os.getenv('CLAUDE_ARTICLE_INPUT_BUDGET', '1500'))
+        self.unified_input_budget = int(os.getenv('CLAUDE_UNIFIED_INPUT_BUDGET', '800'))
         
         # 出力ディレクトリを作成
         os.makedirs(self.output_dir, exist_ok=True)
     
-    def fetch_peaky_articles(self) -> List[Dict]:
+    async def fetch_peaky_articles(self) -> List[Article]:
         """Peaky MediaのRSSフィードからProduct Research記事のみを取得"""
         print("📡 Peaky MediaのRSSフィードを取得中...")
         
         try:
-            # RSSフィードを取得
-            feed = feedparser.parse(self.peaky_feed_url)
-            
-            if feed.bozo:
-                print("⚠️ RSSフィードの解析でエラーが発生しましたが続行します")
-            
-            all_articles = []
-            product_research_articles = []
-            
-            for entry in feed.entries:
-                # 記事情報を抽出
-                article = {
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': self._clean_html_content(getattr(entry, 'summary', '')),
-                    'published': getattr(entry, 'published', ''),
-                    'tags': [tag.term for tag in getattr(entry, 'tags', [])],
-                    'category': getattr(entry, 'category', ''),
-                    'content': self._extract_content(entry)
-                }
-                
-                all_articles.append(article)
-                
-                # Product Researchカテゴリかどうかを判定
-                if self._is_product_research(entry):
-                    product_research_articles.append(article)
+            # RSSフィードを取得（変更がなければキャッシュ済みの記事を使う）
+            cached = self.feed_fetcher.load(self.peaky_feed_url)
+            try:
+                body, validators = await self.feed_fetcher.fetch(self.peaky_feed_url, cached)
+            except (httpx.HTTPError, FeedTooLargeError) as e:
+                if not cached:
+                    raise
+                print(f"⚠️ RSSフィード取得失敗、キャッシュ済みの記事を使用: {e}")
+                body = None
             
-            print(f"✅ Product Research記事: {len(product_research_articles)}件を取得")
-            print(f"📊 フィード全体: {len(all_articles)}件中 {len(product_research_articles)}件を選別")
+            if body is None:
+                try:
+                    product_research_articles = [Article(**article) for article in cached['product_articles']]
+                    category_counts = Counter(cached['category_counts'])
+                    print("♻️ RSSフィードに変更なし、キャッシュ済みの記事を再利用")
+                except (TypeError, KeyError) as e:
+                    # キャッシュが消えている・旧形式（Articleのフィールド変更など）の場合は条件なしで取り直す
+                    print(f"⚠️ キャッシュ済みの記事を読み込めないため取り直します: {e!r}")
+                    body, validators = await self.feed_fetcher.fetch(self.peaky_feed_url, None)
             
-            # カテゴリ別の内訳を表示
-            category_counts = {}
-            for article in all_articles:
-                cat = article['category'] or 'その他'
-                category_counts[cat] = category_counts.get(cat, 0) + 1
+            if body is not None:
+                product_research_articles, category_counts = self._collect_product_articles(
+                    self._iter_feed_items(body, validators.get('content_type'))
+                )
+                try:
+                    self.feed_fetcher.save(self.peaky_feed_url, validators, {
+                        'product_articles': [asdict(article) for article in product_research_articles],
+                        'category_counts': dict(category_counts)
+                    })
+                except OSError as e:
+                    # キャッシュに書けなくても取得・解析済みの記事はそのまま使う
+                    print(f"⚠️ RSSフィードのキャッシュ保存失敗: {e}")
+            
+            print(f"✅ Product Research記事: {len(product_research_articles)}件を取得")
+            print(f"📊 フィード全体: {sum(category_counts.values())}件中 {len(product_research_articles)}件を選別")
             
             print("📋 カテゴリ別内訳:")
-            for cat, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True):
+            for cat, count in category_counts.most_common():
                 mark = "✅" if cat == "Product Research" else "❌"
                 print(f"  {mark} {cat}: {count}件")
             
@@ -82,122 +1014,103 @@ class PeakyArticleGenerator:
             print(f"❌ RSSフィード取得エラー: {e}")
             return []
     
-    def _is_product_research(self, entry) -> bool:
+    def _iter_feed_items(self, body: bytes, content_type: Optional[str]) -> Iterator[Dict]:
+        """RSSフィードの記事データを1件ずつ返す
+        
+        整形式のRSS 2.0は iter_rss_items で逐次解析し、それ以外はfeedparserにフォールバックする。
+        途中で解析エラーになった場合は、返し済みの記事を除いてfeedparserの結果を続ける。
+        """
+        seen_links = set()
+        try:
+            for item in iter_rss_items(body):
+                seen_links.add(item['link'])
+                yield item
+            return
+        except ET.ParseError as e:
+            print(f"⚠️ 高速パーサーで解析できないためfeedparserを使用: {e}")
+        
+        for item in self._parse_feed_with_feedparser(body, content_type):
+            if item['link'] not in seen_links:
+                yield item
+    
+    def _collect_product_articles(self, items: Iterator[Dict]) -> Tuple[List[Article], Counter]:
+        """カテゴリを数えながらProduct Research記事だけを Article にする（要約のみ整形、本文は選別後）"""
+        category_counts = Counter()
+        product_research_articles = []
+        
+        for item in items:
+            category_counts[item['category'] or 'その他'] += 1
+            
+            # Product Researchカテゴリ以外はここで捨てる
+            if not self._is_product_research(item):
+                continue
+            
+            product_research_articles.append(Article(
+                title=item['title'],
+                link=item['link'],
+                # 要約はプロンプトやテンプレート記事に1行で埋め込むため段落区切りも空白1つにまとめる
+                summary=' '.join(self._clean_html_content(item['summary']).split()),
+                published=item['published'],
+                category=item['category'],
+                tags=item['tags'],
+                raw_content=item['content'] or item['summary']
+            ))
+        
+        return product_research_articles, category_counts
+    
+    def _parse_feed_with_feedparser(self, body: bytes, content_type: Optional[str]) -> List[Dict]:
+        """feedparserで解析し、iter_rss_items と同じ形式の記事データにする（不正なフィード用）"""
+        feed = feedparser.parse(body, response_headers={'content-type': content_type or 'application/rss+xml'})
+        
+        if feed.bozo:
+            print("⚠️ RSSフィードの解析でエラーが発生しましたが続行します")
+        
+        return [
+            {
+                'title': entry.title,
+                'link': entry.link,
+                'summary': getattr(entry, 'summary', ''),
+                'published': getattr(entry, 'published', ''),
+                'category': getattr(entry, 'category', ''),
+                'tags': [tag.term for tag in getattr(entry, 'tags', [])],
+                'content': entry.content[0].value if getattr(entry, 'content', None) else ''
+            }
+            for entry in feed.entries
+        ]
+    
+    def _is_product_research(self, item: Dict) -> bool:
         """Product Researchカテゴリの記事かどうかを判定"""
-        # 方法1: category属性で判定（最も確実）
-        if hasattr(entry, 'category') and entry.category == 'Product Research':
+        # 方法1: categoryで判定（最も確実）
+        if item['category'] == 'Product Research':
             return True
         
         # 方法2: tagsで判定（フォールバック）
-        if hasattr(entry, 'tags'):
-            for tag in entry.tags:
-                if tag.term == 'Product Research':
-                    return True
-        
-        return False
+        return 'Product Research' in item['tags']
     
     def _clean_html_content(self, content: str) -> str:
-        """HTMLタグを除去してクリーンなテキストにする"""
-        if not content:
-            return ""
-        
-        # HTMLエンティティをデコード
-        content = html.unescape(content)
-        
-        # HTMLタグを除去
-        content = re.sub(r'<[^>]+>', '', content)
-        
-        # 余分な空白文字を除去
-        content = re.sub(r'\s+', ' ', content)
-        content = content.strip()
-        
-        return content
+        """HTMLタグを除去してクリーンなテキストにする（段落区切りは保持）"""
+        return html_to_text(content)
     
-    def _extract_content(self, entry) -> str:
-        """記事の本文内容を抽出"""
-        content = ""
-        if hasattr(entry, 'content'):
-            content = entry.content[0].value if entry.content else ''
-        elif hasattr(entry, 'summary'):
-            content = entry.summary
-        
-        # HTMLタグをクリーンアップ
-        return self._clean_html_content(content)
-    
-    def select_top_articles(self, articles: List[Dict], count: int = 5) -> List[Dict]:
+    def select_top_articles(self, articles: List[Article], count: int = 5) -> List[Article]:
         """人気・関連性の高いプロダクト記事を選別"""
         print(f"🔍 上位{count}プロダクト記事を選別中...")
         print("⚡ スコアリング基準: 話題性・プロダクト魅力度・新しさ・記事充実度")
         
-        # スコアリング関数（プロダクトリサーチ専用）
-        def score_article(article: Dict) -> float:
-            score = 0
-            
-            # プロダクトの魅力度（特定キーワードでボーナス）
-            high_impact_keywords = [
-                'AI', '自動化', '効率化', '革新的', '画期的', '次世代',
-                'リリース', '発表', '最新', '無料', 'オープンソース',
-                'ノーコード', 'ローコード', 'ブラウザベース', 'API'
-            ]
-            
-            for keyword in high_impact_keywords:
-                if keyword in article['title']:
-                    score += 2
-            
-            # プロダクト関連の重要キーワード
-            product_priority_keywords = [
-                'ツール', 'プラットフォーム', 'サービス', 'アプリ', 
-                'ソフトウェア', 'SaaS', 'ダッシュボード', 'エディタ',
-                'ジェネレーター', 'ビルダー', 'クリエイター'
-            ]
-            
-            for keyword in product_priority_keywords:
-                if keyword in article['title'] or keyword in article['summary']:
-                    score += 1.5
-            
-            # 技術分野の多様性ボーナス
-            tech_categories = [
-                'AI', 'Web開発', 'モバイル', 'デザイン', 'マーケティング',
-                'セキュリティ', 'データ分析', '業務効率化', 'コミュニケーション'
-            ]
-            
-            for category in tech_categories:
-                if category in article['title'] or category in ' '.join(article['tags']):
-                    score += 1
-            
-            # 記事の新しさ（最近の記事を優遇）
-            try:
-                if article['published']:
-                    pub_date = datetime.strptime(article['published'][:19], '%Y-%m-%dT%H:%M:%S')
-                    days_ago = (datetime.now() - pub_date).days
-                    if days_ago <= 1:
-                        score += 5  # 今日・昨日の記事は高得点
-                    elif days_ago <= 7:
-                        score += 3
-                    elif days_ago <= 30:
-                        score += 1
-            except:
-                pass
-            
-            # 要約の充実度
-            if len(article['summary']) > 100:
-                score += 1
-            
-            return score
-        
-        # スコア順でソート
-        scored_articles = [(article, score_article(article)) for article in articles]
-        scored_articles.sort(key=lambda x: x[1], reverse=True)
+        scored_articles = self.scorer.top(articles, count)
         
-        selected = [article for article, score in scored_articles[:count]]
+        selected = [article for article, score in scored_articles]
+        # 入力トークン予算の配分に使うためスコアを残し、選ばれた記事だけ本文HTMLを整形する
+        for article, score in scored_articles:
+            article.score = score
+            article.content = self._clean_html_content(article.raw_content)
         
         print(f"✅ 選別完了:")
-        for i, (article, score) in enumerate(scored_articles[:count], 1):
-            print(f"  {i}. {article['title'][:60]}... (スコア: {score:.1f})")
+        for i, (article, score) in enumerate(scored_articles, 1):
+            print(f"  {i}. {article.title[:60]}... (スコア: {score:.1f})")
         
         return selected
     
-    def _extract_keyword_from_articles(self, selected_articles: List[Dict]) -> str:
+    def _extract_keyword_from_articles(self, selected_articles: List[Article]) -> str:
         """記事からアイキャッチ検索に適したキーワードを抽出"""
         # アイキャッチ検索に適した一般的なキーワード候補
         keyword_candidates = []
@@ -211,7 +1124,7 @@ class PeakyArticleGenerator:
         
         all_text = ""
         for article in selected_articles:
-            all_text += f"{article['title']} {article['summary']} {' '.join(article['tags'])}"
+            all_text += f"{article.title} {article.summary} {' '.join(article.tags)}"
         
         all_text = all_text.lower()
         
@@ -228,15 +1141,15 @@ class PeakyArticleGenerator:
         import random
         return random.choice(keyword_candidates)
     
-    def _generate_article_title(self, selected_articles: List[Dict], keyword: str) -> str:
+    def _generate_article_title(self, selected_articles: List[Article], keyword: str) -> str:
         """魅力的で具体的なタイトルを生成"""
         import random
         
         # 記事の特徴を分析
-        has_ai = any('AI' in article['title'] or 'ai' in article['title'].lower() for article in selected_articles)
-        has_automation = any('自動' in article['title'] or 'automation' in article['title'].lower() for article in selected_articles)
-        has_design = any('デザイン' in article['title'] or 'design' in article['title'].lower() for article in selected_articles)
-        has_dev_tools = any('開発' in article['title'] or '開発者' in ' '.join(article['tags']) for article in selected_articles)
+        has_ai = any('AI' in article.title or 'ai' in article.title.lower() for article in selected_articles)
+        has_automation = any('自動' in article.title or 'automation' in article.title.lower() for article in selected_articles)
+        has_design = any('デザイン' in article.title or 'design' in article.title.lower() for article in selected_articles)
+        has_dev_tools = any('開発' in article.title or '開発者' in ' '.join(article.tags) for article in selected_articles)
         
         # 特徴に応じたタイトルパターン
         if has_ai:
@@ -281,7 +1194,7 @@ class PeakyArticleGenerator:
         main_title = random.choice(title_patterns)
         return f"5分で読める、{main_title} 【今日のキーワード：「{keyword}」】"
     
-    def _generate_keyword_blockquote(self, keyword: str, selected_articles: List[Dict]) -> str:
+    def _generate_keyword_blockquote(self, keyword: str, selected_articles: List[Article]) -> str:
         """キーワードに関するポジティブな感想を生成"""
         import random
         
@@ -330,12 +1243,12 @@ class PeakyArticleGenerator:
         comments = keyword_comments.get(keyword, default_comments)
         return random.choice(comments)
     
-    def _extract_product_tags(self, selected_articles: List[Dict]) -> List[str]:
+    def _extract_product_tags(self, selected_articles: List[Article]) -> List[str]:
         """プロダクト固有名からハッシュタグを抽出"""
         product_tags = []
         
         for article in selected_articles:
-            title = article['title']
+            title = article.title
             
             # プロダクト名を抽出（– または - より前の部分）
             product_name = re.split(r'[–\-]', title)[0].strip()
@@ -347,18 +1260,44 @@ class PeakyArticleGenerator:
         
         return product_tags
 
-    async def _generate_all_content_with_claude(self, selected_articles: List[Dict]) -> Dict[str, str]:
+    # 統合コンテンツ生成で呼び出させるツール（入力スキーマで出力形式を固定する）
+    UNIFIED_CONTENT_TOOL = {
+        "name": "submit_note_content",
+        "description": "Note.com記事のアイキャッチキーワード・blockquote・タイトル・ハッシュタグを登録する",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "keyword": {"type": "string", "description": "Note.comで画像が見つかりやすい1語のキーワード"},
+                "blockquote": {"type": "string", "description": "キーワードに関する親しみやすい感想（1-2行）"},
+                "title": {"type": "string", "description": "指定形式の記事タイトル（キーワードを含む）"},
+                "hashtags": {
+                    "type": "array",
+                    "items": {"type": "string", "pattern": "^#?[A-Za-z0-9]{3,}$"},
+                    "maxItems": 5,
+                    "description": "英数字のみ3文字以上のハッシュタグ"
+                }
+            },
+            "required": ["keyword", "blockquote", "title", "hashtags"]
+        }
+    }
+
+    async def _generate_all_content_with_claude(self, selected_articles: List[Article]) -> Dict[str, str]:
         """Claude APIで全コンテンツを統合生成（効率化版）"""
         print("🤖 Claude APIで統合コンテンツ生成中...")
         
-        # 記事情報をまとめる
+        if not self.claude.is_available():
+            print("🔌 Claude APIが利用できないため個別生成にフォールバック")
+            return await self._generate_individual_content(selected_articles)
+        
+        # 記事情報をまとめる（要約とタグは入力トークン予算に合わせて調整）
+        plans = self._plan_article_inputs(selected_articles, self.unified_input_budget, include_link=False)
         articles_info = []
-        for i, article in enumerate(selected_articles, 1):
+        for i, (article, plan) in enumerate(zip(selected_articles, plans), 1):
             articles_info.append(f"""
 記事{i}:
-タイトル: {article['title']}
-要約: {article['summary'][:200]}...
-タグ: {', '.join(article['tags'][:5])}
+タイトル: {article.title}
+要約: {plan['summary']}
+タグ: {', '.join(plan['tags'])}
 """)
         
         unified_prompt = f"""
@@ -375,12 +1314,7 @@ class PeakyArticleGenerator:
 4. **ハッシュタグ**: プロダクト名から生成した適切なハッシュタグ（最大5個）
 
 出力形式（必須）:
-```
-キーワード: [1語のキーワード]
-blockquote: [親しみやすいコメント文]
-タイトル: [完整なタイトル]
-ハッシュタグ: #tag1 #tag2 #tag3 #tag4 #tag5
-```
+{self.UNIFIED_CONTENT_TOOL['name']} ツールを呼び出して、4つの要素を返してください。
 
 注意事項:
 - キーワードはNote.comで頻繁に更新される分野から選択
@@ -390,13 +1324,23 @@ blockquote: [親しみやすいコメント文]
 """
 
         try:
-            response = await self._call_claude_api_for_content(unified_prompt, max_tokens=800)
-            
-            if response:
-                parsed_content = self._parse_unified_response(response, selected_articles)
+            prompt = unified_prompt
+            # スキーマ検証に失敗したら、エラー内容を添えて1回だけ再生成する
+            for attempt in range(2):
+                response = await self._call_claude_api(prompt, tool=self.UNIFIED_CONTENT_TOOL, kind="unified")
+                if not response:
+                    break
+                
+                parsed_content, error = self._validate_unified_content(response)
                 if parsed_content:
                     print("✅ Claude統合生成完了")
                     return parsed_content
+                
+                print(f"⚠️ 統合レスポンス検証エラー (試行 {attempt + 1}/2): {error}")
+                prompt = f"""{unified_prompt}
+前回の出力は次の理由で無効でした。修正して {self.UNIFIED_CONTENT_TOOL['name']} ツールを呼び出し直してください:
+{error}
+"""
             
             print("⚠️ Claude API統合生成失敗、個別生成にフォールバック")
             return await self._generate_individual_content(selected_articles)
@@ -405,7 +1349,47 @@ blockquote: [親しみやすいコメント文]
             print(f"❌ Claude API統合生成エラー: {e}")
             return await self._generate_individual_content(selected_articles)
 
-    def _parse_unified_response(self, response: str, selected_articles: List[Dict]) -> Dict[str, str]:
+    def _validate_unified_content(self, response: str):
+        """統合生成のツール入力（JSON）を検証し (結果, エラー内容) を返す"""
+        try:
+            content = json.loads(response)
+        except json.JSONDecodeError:
+            # ツールを使わずテキストで返ってきた場合は従来の正規表現解析を試す
+            parsed = self._parse_unified_response(response, [])
+            return (parsed, None) if parsed else (None, "ツール呼び出しではなくテキストで出力されました")
+        
+        if not isinstance(content, dict):
+            return None, "出力がJSONオブジェクトではありません"
+        
+        errors = []
+        result = {}
+        for key in ('keyword', 'blockquote', 'title'):
+            value = content.get(key)
+            if not isinstance(value, str) or not value.strip():
+                errors.append(f"{key} が空または文字列ではありません")
+            else:
+                result[key] = value.strip()
+        
+        if 'keyword' in result and re.search(r'\s', result['keyword']):
+            errors.append("keyword は空白を含まない1語にしてください")
+        if 'title' in result and 'keyword' in result and result['keyword'] not in result['title']:
+            errors.append("title に keyword を含めてください")
+        
+        hashtags = content.get('hashtags', [])
+        if not isinstance(hashtags, list) or not all(isinstance(tag, str) for tag in hashtags):
+            errors.append("hashtags は文字列の配列にしてください")
+        else:
+            tags = ['#' + tag.strip().lstrip('#') for tag in hashtags]
+            invalid = [tag for tag in tags if not re.fullmatch(r'#[A-Za-z0-9]{3,}', tag)]
+            if invalid:
+                errors.append(f"hashtags は英数字3文字以上にしてください: {', '.join(invalid)}")
+            result['hashtags'] = tags[:5]
+        
+        if errors:
+            return None, ' / '.join(errors)
+        return result, None
+
+    def _parse_unified_response(self, response: str, selected_articles: List[Article]) -> Dict[str, str]:
         """統合レスポンスを解析"""
         try:
             result = {}
@@ -444,7 +1428,7 @@ blockquote: [親しみやすいコメント文]
             print(f"⚠️ 統合レスポンス解析エラー: {e}")
             return None
 
-    async def _generate_individual_content(self, selected_articles: List[Dict]) -> Dict[str, str]:
+    async def _generate_individual_content(self, selected_articles: List[Article]) -> Dict[str, str]:
         """個別生成フォールバック"""
         print("🔄 個別コンテンツ生成にフォールバック...")
         
@@ -461,14 +1445,14 @@ blockquote: [親しみやすいコメント文]
             'hashtags': hashtags
         }
 
-    async def _extract_keyword_from_articles_note_optimized(self, selected_articles: List[Dict]) -> str:
+    async def _extract_keyword_from_articles_note_optimized(self, selected_articles: List[Article]) -> str:
         """Note.com最適化キーワード抽出（改良版）"""
         print("🎯 Note.com最適化キーワード抽出中...")
         
         # 記事内容を分析
         all_text = ""
         for article in selected_articles:
-            all_text += f"{article['title']} {article['summary']} {' '.join(article['tags'])}"
+            all_text += f"{article.title} {article.summary} {' '.join(article.tags)}"
         
         all_text_lower = all_text.lower()
         
@@ -518,10 +1502,16 @@ blockquote: [親しみやすいコメント文]
         print(f"🎯 安全なフォールバック: 「{selected}」")
         return selected
     
-    async def generate_article_with_claude(self, selected_articles: List[Dict]) -> str:
+    async def generate_article_with_claude(self, selected_articles: List[Article]) -> str:
         """Claude APIを使って記事を生成（統合コンテンツ生成対応）"""
         print("🤖 Claude APIで記事生成中...")
         
+        if self.fanout_enabled and self.claude.is_available():
+            return await self._generate_article_fanout(selected_articles)
+        
+        if self.parallel_enabled and self.claude.is_available():
+            return await self._generate_article_speculative(selected_articles)
+        
         # 統合コンテンツ生成を試行
         content_elements = await self._generate_all_content_with_claude(selected_articles)
         
@@ -537,69 +1527,15 @@ blockquote: [親しみやすいコメント文]
         
         print(f"🎯 統合生成されたキーワード: 「{keyword}」")
         
-        # プロンプトを構築
-        articles_info = []
-        for i, article in enumerate(selected_articles, 1):
-            articles_info.append(f"""
-記事{i}:
-タイトル: {article['title']}
-URL: {article['link']}
-要約: {article['summary'][:200]}...
-タグ: {', '.join(article['tags'][:5])}
-""")
+        if not self.claude.is_available():
+            print("🔌 Claude APIが利用できないためテンプレート記事にフォールバック")
+            return self._generate_fallback_article(selected_articles)
         
-        prompt = f"""
-以下のPeaky Mediaのプロダクトリサーチ記事を参考に、Note.com向けの親しみやすいプロダクトまとめ記事を作成してください。
-
-参考記事（全てProduct Researchカテゴリ）:
-{''.join(articles_info)}
-
-作成する記事の要件:
-1. タイトル: 「{title}」（既に決定済み）
-2. キーワードblockquote: 「{blockquote}」（既に決定済み）
-3. 導入部: 気軽で親しみやすい導入文（100-150文字程度）
-4. 各プロダクト紹介: {len(selected_articles)}つのプロダクトを200-350文字で親しみやすく紹介
-5. Peaky Mediaリンク: 「公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎」でURL単体配置
-6. 親しみやすい結び: 読者との距離感を縮める呼びかけ
-7. ハッシュタグ: {', '.join(hashtags)} + プロダクト関連タグ
-
-文体の特徴:
-- 親しみやすく話しかけるような文体
-- 「これは便利そう！」「試してみたくなる」という表現
-- 専門用語を避け、一般の方にも分かりやすく
-- Note読者層に合わせた温かみのある表現
-- プロダクトの魅力を分かりやすく伝える
-
-リンクの埋め込み方（重要）:
-- 詳細記事: URL単体で配置（Note.comが自動でプレビューカードを表示）
-- Peaky Media: 「https://peaky.co.jp/」（URL単体で配置）
-※マークダウンリンクは使わず、URL単体で配置してください
-※「詳しくはこちら：」などの余分なテキストは不要です
-
-記事構成:
-# {title}
-
-> {blockquote}
-
-親しみやすい導入文
-
-## 1. プロダクト名
-紹介文
-
-URL
-
-...（{len(selected_articles)}つ繰り返し）
-
-## 最後に
-親しみやすい結び + 「公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎」 + Peaky MediaのURL単体配置
-ハッシュタグ
-
-Markdownフォーマットで出力してください。
-"""
+        prompt = self._build_article_prompt(selected_articles, title, blockquote, hashtags)
 
         try:
             # Claude APIに送信
-            response = await self._call_claude_api(prompt)
+            response = await self._call_claude_api(prompt, stream=True, system=ARTICLE_SYSTEM_PROMPT, kind="article")
             
             if response:
                 print("✅ Claude APIで記事生成完了")
@@ -611,77 +1547,281 @@ Markdownフォーマットで出力してください。
             print(f"❌ Claude API呼び出しエラー: {e}")
             return self._generate_fallback_article(selected_articles)
 
-    async def _generate_article_traditional(self, selected_articles: List[Dict]) -> str:
-        """従来方式での記事生成（フォールバック用）"""
-        print("🔄 従来方式で記事生成中...")
+    # 並行生成時に本文へ埋め込ませるプレースホルダー
+    TITLE_PLACEHOLDER = "{{TITLE}}"
+    BLOCKQUOTE_PLACEHOLDER = "{{BLOCKQUOTE}}"
+    HASHTAGS_PLACEHOLDER = "{{HASHTAGS}}"
+
+    async def _generate_article_speculative(self, selected_articles: List[Article]) -> str:
+        """統合コンテンツ生成と記事本文生成を並行実行し、完了後にタイトル等を差し替える"""
+        print("⚡ 統合コンテンツと記事本文を並行生成中...")
+        start = time.monotonic()
+        
+        placeholder_note = f"""
+並行生成のための注意（重要）:
+- タイトル行は「# {self.TITLE_PLACEHOLDER}」、blockquoteは「> {self.BLOCKQUOTE_PLACEHOLDER}」と書いてください
+- ハッシュタグの先頭に「{self.HASHTAGS_PLACEHOLDER}」を置き、その後にプロダクト関連タグを続けてください
+- これらのプレースホルダーは一字一句そのまま出力し、書き換えないでください
+"""
+        prompt = self._build_article_prompt(
+            selected_articles, self.TITLE_PLACEHOLDER, self.BLOCKQUOTE_PLACEHOLDER,
+            [self.HASHTAGS_PLACEHOLDER], placeholder_note=placeholder_note
+        )
+        
+        content_elements, body = await asyncio.gather(
+            self._generate_all_content_with_claude(selected_articles),
+            self._call_claude_api(prompt, stream=True, system=ARTICLE_SYSTEM_PROMPT, kind="article_parallel"),
+            return_exceptions=True
+        )
+        print(f"⏱️ 並行生成完了: {time.monotonic() - start:.1f}秒")
+        
+        if isinstance(content_elements, Exception) or not content_elements:
+            print(f"⚠️ 統合コンテンツ生成失敗、個別生成で補完: {content_elements}")
+            content_elements = await self._generate_individual_content(selected_articles)
+        
+        print(f"🎯 統合生成されたキーワード: 「{content_elements['keyword']}」")
+        
+        if isinstance(body, Exception) or not body:
+            print(f"❌ 記事本文の並行生成失敗: {body}")
+            return self._generate_fallback_article(selected_articles)
         
-        # キーワードを抽出
-        keyword = self._extract_keyword_from_articles(selected_articles)
-        print(f"🎯 抽出されたキーワード: 「{keyword}」")
+        print("✅ Claude APIで記事生成完了")
+        return self._reconcile_article(body, content_elements)
+
+    def _reconcile_article(self, body: str, content_elements: Dict) -> str:
+        """並行生成した本文のプレースホルダーを統合生成結果で置き換える"""
+        title = content_elements['title']
+        blockquote = content_elements['blockquote']
+        hashtags = ' '.join(content_elements.get('hashtags', []))
         
-        # プロンプトを構築
-        articles_info = []
-        for i, article in enumerate(selected_articles, 1):
-            articles_info.append(f"""
-記事{i}:
-タイトル: {article['title']}
-URL: {article['link']}
-要約: {article['summary'][:200]}...
-タグ: {', '.join(article['tags'][:5])}
-""")
+        # プレースホルダーが守られなかった場合は最初の見出し・引用行を差し替える
+        if self.TITLE_PLACEHOLDER in body:
+            body = body.replace(self.TITLE_PLACEHOLDER, title)
+        else:
+            print("⚠️ タイトルのプレースホルダーが見つからないため最初の見出しを置換")
+            body, count = re.subn(r'^# .*$', lambda _: f"# {title}", body, count=1, flags=re.MULTILINE)
+            if not count:
+                body = f"# {title}\n\n{body}"
         
-        prompt = f"""
-以下のPeaky Mediaのプロダクトリサーチ記事を参考に、Note.com向けの親しみやすいプロダクトまとめ記事を作成してください。
+        if self.BLOCKQUOTE_PLACEHOLDER in body:
+            body = body.replace(self.BLOCKQUOTE_PLACEHOLDER, blockquote)
+        else:
+            print("⚠️ blockquoteのプレースホルダーが見つからないため最初の引用行を置換")
+            body, count = re.subn(r'^> .*$', lambda _: f"> {blockquote}", body, count=1, flags=re.MULTILINE)
+            if not count:
+                body = re.sub(r'^(# .*)$', lambda m: f"{m.group(1)}\n\n> {blockquote}", body, count=1, flags=re.MULTILINE)
+        
+        if self.HASHTAGS_PLACEHOLDER in body:
+            body = body.replace(self.HASHTAGS_PLACEHOLDER, hashtags)
+        elif hashtags:
+            body = body.rstrip() + f"\n\n{hashtags}\n"
+        
+        return body
 
-参考記事（全てProduct Researchカテゴリ）:
-{''.join(articles_info)}
+    async def _generate_article_fanout(self, selected_articles: List[Article]) -> str:
+        """導入・各プロダクト紹介・結びを個別に並行生成し、固定レイアウトに組み立てる"""
+        print(f"🧩 セクション単位で並行生成中... (同時実行数: {self.fanout_concurrency})")
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(self.fanout_concurrency)
+        
+        product_list = '\n'.join(f"- {article.title}" for article in selected_articles)
+        style = """文体: 親しみやすく話しかけるような文体で、専門用語を避け、Note読者に温かみのある表現にしてください。
+見出し・URL・ハッシュタグ・前置きは書かず、本文のみを出力してください。"""
+        
+        async def generate_section(prompt: str, fallback: str, label: str, kind: str) -> str:
+            async with semaphore:
+                try:
+                    text = await self._call_claude_api(prompt, kind=kind)
+                    if text and text.strip():
+                        return text.strip()
+                    print(f"⚠️ {label}の生成結果が空のためフォールバック")
+                except Exception as e:
+                    print(f"⚠️ {label}の生成失敗、フォールバック: {e}")
+                return fallback
+        
+        intro_prompt = f"""
+Note.com向けのプロダクトまとめ記事の導入文（100-150文字程度）を書いてください。
+今回紹介するプロダクト:
+{product_list}
 
-作成する記事の要件:
-1. タイトル: 「5分で読める、[具体的で魅力的な内容] 【今日のキーワード：「{keyword}」】」の形式
-2. キーワードblockquote: 記事冒頭に「{keyword}」について、テクノロジーやスタートアップが好きなポジティブな人の視点からの1-2行コメント
-3. 導入部: 気軽で親しみやすい導入文（100-150文字程度）
-4. 各プロダクト紹介: {len(selected_articles)}つのプロダクトを200-350文字で親しみやすく紹介
-5. Peaky Mediaリンク: 「公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎」でURL単体配置
-6. 親しみやすい結び: 読者との距離感を縮める呼びかけ
-7. ハッシュタグ: プロダクト名 + プロダクト関連タグ
+{style}
+"""
+        intro_fallback = f"""こんにちは！今回は最近見つけた面白いプロダクトを{len(selected_articles)}つご紹介します。
 
-文体の特徴:
-- 親しみやすく話しかけるような文体
-- 「これは便利そう！」「試してみたくなる」という表現
-- 専門用語を避け、一般の方にも分かりやすく
-- Note読者層に合わせた温かみのある表現
-- プロダクトの魅力を分かりやすく伝える
+どれも「これは便利そう！」と思えるツールばかりで、日々の作業を効率化してくれそうです。"""
+        
+        closing_prompt = f"""
+Note.com向けのプロダクトまとめ記事の結び（100-150文字程度）を書いてください。
+読者との距離感を縮める呼びかけで締めてください。
+今回紹介したプロダクト:
+{product_list}
 
-リンクの埋め込み方（重要）:
-- 詳細記事: URL単体で配置（Note.comが自動でプレビューカードを表示）
-- Peaky Media: 「https://peaky.co.jp/」（URL単体で配置）
-※マークダウンリンクは使わず、URL単体で配置してください
-※「詳しくはこちら：」などの余分なテキストは不要です
+{style}
+"""
+        closing_fallback = f"""今回ご紹介した{len(selected_articles)}つのプロダクト、いかがでしたでしょうか？
 
-記事構成:
-# 5分で読める、[具体的で魅力的なタイトル] 【今日のキーワード：「{keyword}」】
+気になるものがあれば、ぜひ試してみてくださいね。"""
+        
+        # 記事本文プロンプトと同じ入力トークン予算をスコアに応じて各セクションへ配分
+        plans = self._plan_article_inputs(selected_articles, self.article_input_budget, include_link=False)
+        section_tasks = []
+        for i, (article, plan) in enumerate(zip(selected_articles, plans), 1):
+            section_prompt = f"""
+以下のプロダクトを、Note.com読者向けに200-350文字で親しみやすく紹介してください。
+「これは便利そう！」「試してみたくなる」と感じられるよう、魅力を分かりやすく伝えてください。
 
-> キーワード「{keyword}」についてのポジティブなコメント（1-2行、エンジニア表現は避ける）
+タイトル: {article.title}
+要約: {plan['summary']}
+タグ: {', '.join(plan['tags'])}
 
-親しみやすい導入文
+{style}
+"""
+            summary = article.summary
+            if len(summary) > 180:
+                summary = summary[:180] + "..."
+            elif len(summary) < 60:
+                summary = "とても魅力的なプロダクトで、使ってみたくなる機能がたくさんありそうです。"
+            section_tasks.append(generate_section(section_prompt, summary, f"プロダクト{i}", "fanout_product"))
+        
+        # メタデータ生成はセマフォの外で各セクションと同時に走らせる
+        content_elements, intro, closing, *sections = await asyncio.gather(
+            self._generate_all_content_with_claude(selected_articles),
+            generate_section(intro_prompt, intro_fallback, "導入文", "fanout_intro"),
+            generate_section(closing_prompt, closing_fallback, "結び", "fanout_closing"),
+            *section_tasks
+        )
+        print(f"⏱️ セクション並行生成完了: {time.monotonic() - start:.1f}秒")
+        print(f"🎯 統合生成されたキーワード: 「{content_elements['keyword']}」")
+        
+        article_content = f"""# {content_elements['title']}
 
-## 1. プロダクト名
-紹介文
+> {content_elements['blockquote']}
 
-URL
+{intro}
 
-...（{len(selected_articles)}つ繰り返し）
+"""
+        for i, (article, section) in enumerate(zip(selected_articles, sections), 1):
+            product_name = re.split(r'[–\-]', article.title)[0].strip()
+            article_content += f"""## {i}. {product_name}
 
-## 最後に
-親しみやすい結び + 「公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎」 + Peaky MediaのURL単体配置
-ハッシュタグ
+{section}
+
+{article.link}
+
+"""
+        
+        hashtags = content_elements.get('hashtags', []) + self._extract_product_tags(selected_articles)
+        article_content += f"""## 最後に
+
+{closing}
+
+公式メディアで、毎日プロダクトリサーチを更新しています！お気軽にチェックしてみてください⬇︎
+
+https://peaky.co.jp/
+
+---
+
+{' '.join(dict.fromkeys(hashtags))}
+"""
+        
+        print("✅ Claude APIで記事生成完了")
+        return article_content
+
+    # 予算が少ない記事でも要約に最低限割り当てるトークン数と、タグ数の上限
+    MIN_SUMMARY_TOKENS = 40
+    MAX_PROMPT_TAGS = 8
+
+    def _plan_article_inputs(self, selected_articles: List[Article], budget_tokens: int,
+                             include_link: bool = True) -> List[Dict]:
+        """入力トークン予算をスコアに応じて記事へ配分し、要約とタグを予算内に収める
+        
+        予算に余裕がある記事は要約より長い本文（content）まで広げて使う。
+        """
+        weights = [max(article.score, 0) + 1 for article in selected_articles]
+        total_weight = sum(weights) or 1
+        plans = []
+        
+        for article, weight in zip(selected_articles, weights):
+            allowance = budget_tokens * weight / total_weight
+            
+            # タグは配分の15%以内（最低1つ）
+            tags = []
+            for tag in article.tags[:self.MAX_PROMPT_TAGS]:
+                if tags and estimate_tokens(', '.join(tags + [tag])) > allowance * 0.15:
+                    break
+                tags.append(tag)
+            
+            # 見出し行などの固定分を差し引いた残りを要約に充てる
+            overhead = estimate_tokens(article.title) + estimate_tokens(', '.join(tags)) + 15
+            if include_link:
+                overhead += estimate_tokens(article.link)
+            summary_tokens = max(allowance - overhead, self.MIN_SUMMARY_TOKENS)
+            
+            source = article.summary
+            content = article.content
+            if estimate_tokens(source) < summary_tokens and len(content) > len(source):
+                # 本文も「要約:」の行に埋め込むため、段落区切りは空白1つにまとめる
+                source = ' '.join(content.split())
+            
+            plans.append({'summary': trim_to_tokens(source, summary_tokens), 'tags': tags})
+        
+        estimated = sum(estimate_tokens(plan['summary']) + estimate_tokens(', '.join(plan['tags'])) for plan in plans)
+        print(f"📐 記事データ: 推定 {estimated} トークン (予算 {budget_tokens})")
+        return plans
+
+    def _format_articles_info(self, selected_articles: List[Article]) -> str:
+        """参考記事の一覧をプロンプト用のテキストにまとめる（要約とタグは入力トークン予算に合わせて調整）"""
+        plans = self._plan_article_inputs(selected_articles, self.article_input_budget)
+        articles_info = []
+        for i, (article, plan) in enumerate(zip(selected_articles, plans), 1):
+            articles_info.append(f"""
+記事{i}:
+タイトル: {article.title}
+URL: {article.link}
+要約: {plan['summary']}
+タグ: {', '.join(plan['tags'])}
+""")
+        return ''.join(articles_info)
+
+    def _build_article_prompt(self, selected_articles: List[Article], title: str, blockquote: str,
+                              hashtags: List[str], placeholder_note: str = "") -> str:
+        """決定済みのタイトル・blockquote・ハッシュタグを渡す記事データ（ARTICLE_SYSTEM_PROMPTに続く可変部分）"""
+        return f"""
+参考記事（全てProduct Researchカテゴリ、{len(selected_articles)}件）:
+{self._format_articles_info(selected_articles)}
+
+記事データ:
+- タイトル: 「{title}」（既に決定済み、そのまま使用）
+- キーワードblockquote: 「{blockquote}」（既に決定済み、そのまま使用）
+- ハッシュタグ: {', '.join(hashtags)}
+{placeholder_note}"""
+
+    async def _generate_article_traditional(self, selected_articles: List[Article]) -> str:
+        """従来方式での記事生成（フォールバック用）"""
+        print("🔄 従来方式で記事生成中...")
+        
+        if not self.claude.is_available():
+            print("🔌 Claude APIが利用できないためテンプレート記事にフォールバック")
+            return self._generate_fallback_article(selected_articles)
+        
+        # キーワードを抽出
+        keyword = self._extract_keyword_from_articles(selected_articles)
+        print(f"🎯 抽出されたキーワード: 「{keyword}」")
+        
+        prompt = f"""
+参考記事（全てProduct Researchカテゴリ、{len(selected_articles)}件）:
+{self._format_articles_info(selected_articles)}
 
-Markdownフォーマットで出力してください。
+記事データ:
+- タイトル: 「5分で読める、[具体的で魅力的な内容] 【今日のキーワード：「{keyword}」】」の形式
+- キーワードblockquote: 「{keyword}」について、テクノロジーやスタートアップが好きなポジティブな人の視点からのコメント（エンジニア表現は避ける）
+- ハッシュタグ: プロダクト名から作成
 """
 
         try:
             # Claude APIに送信
-            response = await self._call_claude_api(prompt)
+            response = await self._call_claude_api(prompt, stream=True, system=ARTICLE_SYSTEM_PROMPT,
+                                                   kind="article_traditional")
             
             if response:
                 print("✅ 従来方式で記事生成完了")
@@ -693,91 +1833,71 @@ Markdownフォーマットで出力してください。
             print(f"❌ 従来方式API呼び出しエラー: {e}")
             return self._generate_fallback_article(selected_articles)
     
-    async def _call_claude_api(self, prompt: str) -> str:
-        """Claude APIを呼び出し"""
-        url = "https://api.anthropic.com/v1/messages"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": self.anthropic_api_key,
-            "anthropic-version": "2023-06-01"
-        }
-        
-        data = {
-            "model": "claude-3-5-sonnet-20241022",
-            "max_tokens": 2000,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 401:
-                print("❌ 認証エラー: APIキーが無効です")
-                return None
-            elif response.status_code == 404:
-                print("❌ エンドポイントが見つかりません")
-                return None
-            
-            response.raise_for_status()
-            result = response.json()
-            return result['content'][0]['text']
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ API通信エラー: {e}")
-            return None
-        except (KeyError, IndexError) as e:
-            print(f"❌ APIレスポンス解析エラー: {e}")
-            return None
+    def _route_for(self, kind: str) -> Dict:
+        """呼び出し箇所に対応するモデルルーティング設定を返す"""
+        return (self.model_routes.get(kind) or self.model_routes.get(kind.split('_')[0])
+                or self.model_routes['other'])
 
-    async def _call_claude_api_for_content(self, prompt: str, max_tokens: int = 800) -> str:
-        """統合コンテンツ生成用のClaude API呼び出し"""
-        url = "https://api.anthropic.com/v1/messages"
+    async def _call_claude_api(self, prompt: str, stream: bool = False, tool: Optional[Dict] = None,
+                               system: Optional[str] = None, kind: str = "other") -> str:
+        """Claude APIを呼び出し（共有クライアント経由、呼び出し箇所ごとのモデルルーティング付き）
         
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": self.anthropic_api_key,
-            "anthropic-version": "2023-06-01"
-        }
+        レイテンシ目標を超えたら高速モデルにも並行してリクエストし、先に成功した応答を使う。
+        """
+        route = self._route_for(kind)
+        model, fallback_model = route['model'], route.get('fallback_model')
+        target = route.get('latency_target')
         
-        data = {
-            "model": "claude-3-5-sonnet-20241022",
-            "max_tokens": max_tokens,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        }
+        if fallback_model and kind in self.slow_kinds:
+            print(f"🐇 {kind}: 前回レイテンシ目標を超過したため {fallback_model} を使用")
+            return await self._request_model(prompt, fallback_model, route, stream, tool, system, kind)
+        
+        primary = asyncio.create_task(self._request_model(prompt, model, route, stream, tool, system, kind))
+        if not fallback_model or not target:
+            return await primary
         
+        tasks = {primary}
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            done, _ = await asyncio.wait(tasks, timeout=target)
+            if done:
+                return primary.result()
             
-            if response.status_code == 401:
-                print("❌ 認証エラー: APIキーが無効です")
-                return None
-            elif response.status_code == 404:
-                print("❌ エンドポイントが見つかりません")
-                return None
-            
-            response.raise_for_status()
-            result = response.json()
-            return result['content'][0]['text']
+            print(f"🐢 {kind}: {model} がレイテンシ目標 {target}秒を超過、{fallback_model} へ並行リクエスト")
+            # 進行中ファイルは元のストリームが使っているため、フォールバックは非ストリーミングで受信する
+            backup = asyncio.create_task(self._request_model(prompt, fallback_model, route, False, tool, system, kind))
+            tasks.add(backup)
             
-        except requests.exceptions.RequestException as e:
-            print(f"❌ API通信エラー: {e}")
-            return None
-        except (KeyError, IndexError) as e:
-            print(f"❌ APIレスポンス解析エラー: {e}")
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result():
+                        if task is backup:
+                            # フォールバックが先に応答した場合だけ、以降この呼び出し箇所はフォールバックを使う
+                            self.slow_kinds.add(kind)
+                        print(f"✅ {kind}: {'フォールバック' if task is backup else '元'}モデルの応答を採用")
+                        return task.result()
             return None
+        finally:
+            # 負けた側（ストリーミング中なら進行中ファイルへの書き込みも）を確実に止めてから戻る
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
-    def _generate_fallback_article(self, selected_articles: List[Dict]) -> str:
+    async def _request_model(self, prompt: str, model: str, route: Dict, stream: bool,
+                             tool: Optional[Dict], system: Optional[str], kind: str) -> str:
+        """指定モデルでClaude APIを1回呼び出す"""
+        if stream and self.stream_enabled:
+            print(f"📡 ストリーミング受信中... ({model}, 進行状況: {self.progress_path})")
+            return await self.claude.create_message(
+                prompt, max_tokens=route['max_tokens'], stream=True, progress_path=self.progress_path,
+                system=system, kind=kind, model=model
+            )
+        return await self.claude.create_message(
+            prompt, max_tokens=route['max_tokens'], tool=tool, system=system, kind=kind, model=model
+        )
+    
+    def _generate_fallback_article(self, selected_articles: List[Article]) -> str:
         """プロダクトリサーチ専用の親しみやすい記事テンプレート"""
         print("📝 プロダクト専用記事を生成中...")
         
@@ -802,10 +1922,10 @@ Markdownフォーマットで出力してください。
         
         for i, article in enumerate(selected_articles, 1):
             # プロダクト名を抽出（タイトルの最初の部分）
-            product_name = re.split(r'[–\-]', article['title'])[0].strip()
+            product_name = re.split(r'[–\-]', article.title)[0].strip()
             
             # 要約を適切な長さに調整
-            summary = article['summary']
+            summary = article.summary
             if len(summary) > 180:
                 summary = summary[:180] + "..."
             elif len(summary) < 60:
@@ -815,7 +1935,7 @@ Markdownフォーマットで出力してください。
 
 {summary}
 
-{article['link']}
+{article.link}
 
 """
         
@@ -869,6 +1989,10 @@ https://peaky.co.jp/
                 f.write(cleaned_content)
             
             print(f"✅ 記事を保存しました: {filepath} ({timezone_info}: {today})")
+            
+            # ストリーミング受信中の一時ファイルを削除
+            if os.path.exists(self.progress_path):
+                os.remove(self.progress_path)
             return filepath
             
         except Exception as e:
@@ -936,7 +2060,7 @@ https://peaky.co.jp/
         
         try:
             # 1. RSSフィードからProduct Research記事のみ取得
-            articles = self.fetch_peaky_articles()
+            articles = await self.fetch_peaky_articles()
             
             if not articles:
                 print("❌ Product Research記事が取得できませんでした")
@@ -971,6 +2095,9 @@ https://peaky.co.jp/
                 
         except Exception as e:
             print(f"❌ システムエラー: {e}")
+        
+        finally:
+            await self.claude.aclose()
 
 async def main():
     """エントリーポイント"""
@@ -984,4 +2111,8 @@ async def main():
         print(f"❌ 予期しないエラー: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "report":
+        # python create.py report [ログファイル]
+        print_telemetry_report(sys.argv[2] if len(sys.argv) > 2 else os.getenv('CLAUDE_TELEMETRY_FILE') or DEFAULT_TELEMETRY_FILE)
+    else:
+        asyncio.run(main())
\ No newline at end of file
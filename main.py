@@ -8,8 +8,11 @@ Note.com自動投稿システム（完全版）
 import os
 import asyncio
 import re
+import html
+import json
 import requests
 import glob
+from fnmatch import fnmatch
 from datetime import datetime
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
@@ -17,10 +20,212 @@ from dotenv import load_dotenv
 # 環境変数読み込み
 load_dotenv()
 
+# リソースブロックのカテゴリ別URLパターン（Chromium側でブロックするためPython往復なし）
+# アイキャッチ候補画像は assets.st-note.com から配信されるため image には含めない
+# 拡張子のパターンは末尾にも * を付け、クエリ文字列付きのURL（.woff2?v=3 など）にも一致させる
+BLOCKED_URL_PATTERNS = {
+    'font': [
+        '*.woff*', '*.ttf*', '*.otf*',
+        '*fonts.googleapis.com*', '*fonts.gstatic.com*'
+    ],
+    'analytics': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*analytics.google.com*',
+        '*connect.facebook.net*', '*clarity.ms*', '*hotjar.com*', '*newrelic.com*',
+        '*nr-data.net*', '*sentry.io*', '*analytics.twitter.com*'
+    ],
+    'ads': [
+        '*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*',
+        '*adservice.google.*', '*amazon-adsystem.com*', '*criteo.*', '*ads-twitter.com*'
+    ],
+    'image': [
+        '*pbs.twimg.com*', '*i.ytimg.com*', '*googleusercontent.com*',
+        '*gravatar.com*', '*.gif*'
+    ]
+}
+
+# 編集画面の状態を1回のevaluateで取得するプローブ
+DOM_STATE_PROBE_JS = """() => {
+    const isVisible = (el) => !!el && el.getClientRects().length > 0
+        && getComputedStyle(el).visibility !== 'hidden';
+    const title = document.querySelector('textarea[placeholder="記事タイトル"]');
+    const editor = document.querySelector('.ProseMirror');
+    const eyecatch = document.querySelector(
+        '.editor-eyecatch img, [data-testid="eyecatch-image"] img, img.eyecatch-image'
+    );
+    const dialogs = Array.from(document.querySelectorAll(
+        '[role="dialog"], [role="alertdialog"], .modal, .o-modal'
+    )).filter(isVisible);
+    const publish = Array.from(document.querySelectorAll('button, [role="button"]'))
+        .find((el) => isVisible(el) && el.textContent.includes('公開に進む'));
+    const searchInput = Array.from(document.querySelectorAll('input[placeholder*="検索"]'))
+        .find(isVisible);
+    
+    return {
+        titlePresent: isVisible(title),
+        titleLength: title ? title.value.length : 0,
+        editorPresent: isVisible(editor),
+        bodyLength: editor ? editor.innerText.trim().length : 0,
+        eyecatchPresent: !!eyecatch,
+        eyecatchLoaded: !!eyecatch && eyecatch.complete && eyecatch.naturalWidth > 0,
+        noteImageCount: document.querySelectorAll('img[src*="assets.st-note.com"]').length,
+        openDialogs: dialogs.map((dialog) => ({
+            role: dialog.getAttribute('role') || dialog.className,
+            text: dialog.innerText.trim().slice(0, 200),
+            buttons: Array.from(dialog.querySelectorAll('button, [role="button"]'))
+                .filter(isVisible)
+                .map((button) => button.innerText.trim())
+                .filter(Boolean)
+        })),
+        searchOpen: !!searchInput || dialogs.some((dialog) => dialog.innerText.includes('検索')),
+        publishButtonPresent: !!publish,
+        publishButtonEnabled: !!publish && !publish.disabled
+            && publish.getAttribute('aria-disabled') !== 'true'
+    };
+}"""
+
+# ダイアログの出現をPythonへ通知するMutationObserver（__noteDialogReport バインディング経由）
+DIALOG_OBSERVER_JS = """(() => {
+    const SELECTOR = '[role="dialog"], [role="alertdialog"], .modal, .o-modal, .error-dialog';
+    const reported = new WeakMap();
+    const isVisible = (el) => el.getClientRects().length > 0
+        && getComputedStyle(el).visibility !== 'hidden';
+    
+    const scan = () => {
+        for (const dialog of document.querySelectorAll(SELECTOR)) {
+            if (!isVisible(dialog)) {
+                continue;
+            }
+            const text = dialog.innerText.trim().slice(0, 500);
+            if (!text || reported.get(dialog) === text) {
+                continue;
+            }
+            reported.set(dialog, text);
+            window.__noteDialogReport({
+                role: dialog.getAttribute('role') || dialog.className,
+                text: text,
+                buttons: Array.from(dialog.querySelectorAll('button, [role="button"]'))
+                    .filter(isVisible)
+                    .map((button) => button.innerText.trim())
+                    .filter(Boolean)
+            });
+        }
+    };
+    
+    const start = () => {
+        new MutationObserver(scan).observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: ['class', 'style', 'aria-hidden', 'open']
+        });
+        scan();
+    };
+    
+    if (document.documentElement) {
+        start();
+    } else {
+        document.addEventListener('DOMContentLoaded', start);
+    }
+})();"""
+
+# 公開時のエラーダイアログと判定する文言
+PUBLISH_ERROR_PATTERNS = [
+    "タイトル、本文を入力",
+    "入力してください",
+    "必須項目",
+    "読み込み中",
+    "準備中",
+    "エラー"
+]
+
+# エラーダイアログを閉じるボタンの文言
+CLOSE_BUTTON_TEXTS = ["閉じる", "OK", "了解", "×", "✕"]
+
+# URL単体行（Noteのエディタで埋め込みカードに置き換わる）
+STANDALONE_URL_RE = re.compile(r'https?://\S+')
+
+
+class SelectorRegistry:
+    """ステップごとに成功したセレクタを記録するレジストリ（実行間でファイルに永続化）"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.steps = {}
+        
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.steps = json.load(f)
+                print(f"📚 セレクタ学習データを読み込みました: {path} ({len(self.steps)}ステップ)")
+            except Exception as e:
+                print(f"⚠️ セレクタ学習データ読み込み失敗（初期状態で続行）: {e}")
+    
+    def order(self, step, selectors):
+        """実績のあるセレクタを先頭に、マッチしなくなったセレクタを末尾に並べ替え"""
+        stats = self.steps.get(step, {})
+        
+        def sort_key(item):
+            index, selector = item
+            entry = stats.get(selector)
+            if entry is None:
+                return (1, 0, index)
+            if entry['misses'] > 0:
+                return (2, entry['misses'], index)
+            return (0, -entry['hits'], index)
+        
+        return [selector for _, selector in sorted(enumerate(selectors), key=sort_key)]
+    
+    def best(self, step, selectors):
+        """直近で成功しているセレクタのうち最も実績のあるものを返す"""
+        stats = self.steps.get(step, {})
+        proven = [s for s in selectors if s in stats and stats[s]['misses'] == 0]
+        if not proven:
+            return None
+        return max(proven, key=lambda s: stats[s]['hits'])
+    
+    def record_hit(self, step, selector):
+        entry = self.steps.setdefault(step, {}).setdefault(
+            selector, {'hits': 0, 'misses': 0, 'last_success': None}
+        )
+        entry['hits'] += 1
+        entry['misses'] = 0
+        entry['last_success'] = datetime.now().isoformat(timespec='seconds')
+    
+    def record_miss(self, step, selector):
+        entry = self.steps.get(step, {}).get(selector)
+        if entry is not None:
+            entry['misses'] += 1
+    
+    def save(self):
+        if not self.path:
+            return
+        
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.steps, f, ensure_ascii=False, indent=2)
+            print(f"📚 セレクタ学習データを保存しました: {self.path}")
+        except Exception as e:
+            print(f"⚠️ セレクタ学習データ保存失敗: {e}")
+
+
 class NoteAutoPoster:
     def __init__(self):
         self.browser = None
         self.page = None
+        # 本文入力モード: html（HTMLペースト）/ paste（テキストペースト）/ insert_text（一括insertText）/ type（1文字ずつ入力）
+        self.insert_mode = os.getenv('NOTE_INSERT_MODE', 'html')
+        # ログインセッション保存先（明示的に指定した場合のみ再利用し、未指定なら毎回ログアウト）
+        # 保存ファイルはログイン済みCookieそのものなので、CIキャッシュ等の共有ストレージには置かないこと
+        self.session_file = os.getenv('NOTE_SESSION_FILE', '')
+        self.context = None
+        # ブロックするリソースカテゴリ（カンマ区切り、all で全カテゴリ、空でブロックなし）
+        self.blocked_categories = self._parse_blocked_categories(os.getenv('NOTE_BLOCK_RESOURCES', ''))
+        self.blocked_counts = {}
+        # ステップごとのセレクタ学習データ（空文字で無効化）
+        self.selector_registry = SelectorRegistry(os.getenv('NOTE_SELECTOR_REGISTRY', '.note_selectors.json'))
+        # MutationObserverから通知されたダイアログ
+        self.dialog_reports = []
+        self.error_dialog_event = asyncio.Event()
         
     async def setup_browser(self, headless=False):
         """ブラウザセットアップ"""
@@ -38,23 +243,147 @@ class NoteAutoPoster:
             ]
         )
         
-        context = await self.browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        )
-        self.page = await context.new_page()
+        context_options = {
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
         
-        # ネットワークエラーを無視
-        await self.page.route("**/*", self._handle_route)
+        # 保存済みのログインセッションがあれば復元
+        if self.session_file and os.path.exists(self.session_file):
+            try:
+                self.context = await self.browser.new_context(
+                    storage_state=self.session_file, **context_options
+                )
+                print(f"🍪 保存済みセッションを読み込みました: {self.session_file}")
+            except Exception as e:
+                print(f"⚠️ セッション読み込み失敗（新規セッションで続行）: {e}")
+        
+        if self.context is None:
+            self.context = await self.browser.new_context(**context_options)
+        
+        # ダイアログ出現の通知を受け取る（ポーリング不要）
+        await self.context.expose_binding('__noteDialogReport', self._on_dialog_report)
+        await self.context.add_init_script(DIALOG_OBSERVER_JS)
+        
+        self.page = await self.context.new_page()
+        
+        # リソースブロック（デフォルトでは通信に介入しない）
+        if self.blocked_categories:
+            await self._setup_resource_blocking()
+    
+    @staticmethod
+    def _parse_blocked_categories(value):
+        """NOTE_BLOCK_RESOURCES の値をカテゴリのリストに変換"""
+        categories = [c.strip() for c in value.split(',') if c.strip()]
+        if 'all' in categories:
+            return list(BLOCKED_URL_PATTERNS)
+        
+        unknown = [c for c in categories if c not in BLOCKED_URL_PATTERNS]
+        if unknown:
+            print(f"⚠️ 不明なリソースカテゴリを無視します: {', '.join(unknown)}")
+        return [c for c in categories if c in BLOCKED_URL_PATTERNS]
+
+    async def _setup_resource_blocking(self):
+        """ブラウザ側のURLブロックを設定（CDP Network.setBlockedURLs）"""
+        patterns = [
+            pattern
+            for category in self.blocked_categories
+            for pattern in BLOCKED_URL_PATTERNS[category]
+        ]
         
-    async def _handle_route(self, route):
-        """ルートハンドラー"""
         try:
-            await route.continue_()
-        except Exception:
-            pass
+            cdp = await self.context.new_cdp_session(self.page)
+            await cdp.send('Network.enable')
+            await cdp.send('Network.setBlockedURLs', {'urls': patterns})
+            self.page.on('requestfailed', self._on_request_failed)
+            print(f"🚫 リソースブロック有効: {', '.join(self.blocked_categories)} ({len(patterns)}パターン)")
+        except Exception as e:
+            print(f"⚠️ リソースブロック設定失敗（ブロックなしで続行）: {e}")
+
+    def _on_request_failed(self, request):
+        """ブロックされたリクエストをカテゴリ別に集計"""
+        if 'ERR_BLOCKED_BY_CLIENT' not in (request.failure or ''):
+            return
+        
+        for category in self.blocked_categories:
+            if any(fnmatch(request.url, pattern) for pattern in BLOCKED_URL_PATTERNS[category]):
+                self.blocked_counts[category] = self.blocked_counts.get(category, 0) + 1
+                return
+
+    def _on_dialog_report(self, source, dialog):
+        """MutationObserverからのダイアログ通知を記録"""
+        self.dialog_reports.append(dialog)
+        print(f"🔔 ダイアログ出現: {dialog['text'][:60]}... (ボタン: {', '.join(dialog['buttons'])})")
+        
+        if self._is_publish_error(dialog):
+            self.error_dialog_event.set()
+
+    @staticmethod
+    def _is_publish_error(dialog):
+        """ダイアログが公開エラーかを判定"""
+        if dialog.get('role') == 'alertdialog':
+            return True
+        return any(pattern in dialog.get('text', '') for pattern in PUBLISH_ERROR_PATTERNS)
+
+    def _reset_dialog_reports(self):
+        """ダイアログ通知の記録をリセット"""
+        self.dialog_reports.clear()
+        self.error_dialog_event.clear()
+
+    def _report_blocked_resources(self):
+        """ブロックしたリクエスト数をカテゴリ別に表示
+        
+        ブロックしたリクエストはレスポンスを受け取らないため、転送量の削減分は計測していない。
+        """
+        if not self.blocked_categories:
+            return
+        
+        total_requests = sum(self.blocked_counts.values())
+        print(f"🚫 リソースブロック結果: {total_requests}リクエスト削減（転送量は未計測）")
+        for category, count in sorted(self.blocked_counts.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {category}: {count}件")
     
+    async def _has_valid_session(self):
+        """保存済みセッションが有効かを1リクエストで確認"""
+        if not self.session_file or not os.path.exists(self.session_file):
+            return False
+        
+        try:
+            response = await self.context.request.get(
+                "https://note.com/api/v2/current_user", timeout=10000
+            )
+            if response.status != 200:
+                print(f"⚠️ 保存済みセッションは期限切れです (status: {response.status})")
+                return False
+            
+            data = await response.json()
+            if data.get('data'):
+                print("✅ 保存済みセッションが有効です")
+                return True
+            
+            print("⚠️ 保存済みセッションは期限切れです")
+            return False
+            
+        except Exception as e:
+            print(f"⚠️ セッション確認エラー: {e}")
+            return False
+
+    async def _save_session(self):
+        """ログインセッションをファイルに保存"""
+        if not self.session_file:
+            return
+        
+        try:
+            await self.context.storage_state(path=self.session_file)
+            print(f"🍪 ログインセッションを保存しました: {self.session_file}")
+        except Exception as e:
+            print(f"⚠️ セッション保存失敗: {e}")
+
     async def login(self):
-        """Note.comログイン処理"""
+        """Note.comログイン処理（保存済みセッション再利用対応）"""
+        if await self._has_valid_session():
+            print("✅ 保存済みセッションでログイン済み（ログイン処理をスキップ）")
+            return True
+        
         print("🔑 Note.comログイン開始...")
         
         try:
@@ -121,6 +450,7 @@ class NoteAutoPoster:
                     raise Exception("ログインに失敗しました")
             
             print("✅ ログイン成功！")
+            await self._save_session()
             return True
             
         except Exception as e:
@@ -142,35 +472,26 @@ class NoteAutoPoster:
             # 1. 投稿ページにアクセス
             print("📝 投稿ページにアクセス中...")
             await self.page.goto("https://note.com/new", wait_until="networkidle")
-            await self.page.wait_for_timeout(3000)
             
             # 2. タイトル入力
             print("📄 タイトルを入力中...")
             title_selectors = [
                 'textarea[placeholder="記事タイトル"]',
                 '.sc-80832eb4-0.heevId',
-                'textarea[spellcheck="true"]',
-                'textarea:has-text("")'
+                'textarea[spellcheck="true"]'
             ]
             
-            title_input = None
-            for selector in title_selectors:
-                try:
-                    title_input = self.page.locator(selector).first
-                    if await title_input.is_visible():
-                        await title_input.click()
-                        await title_input.clear()
-                        await title_input.fill(title)
-                        print(f"✅ タイトル入力完了: {selector}")
-                        break
-                except Exception as e:
-                    print(f"⚠️ タイトル入力試行失敗: {selector} - {e}")
-                    continue
-            
+            # 投稿ページの表示を待ちつつ全候補を同時に評価
+            title_input, selector = await self._find_visible(
+                title_selectors, "タイトル入力欄", timeout=10000, fallbacks=['textarea:has-text("")']
+            )
             if title_input is None:
                 raise Exception("タイトル入力欄が見つかりません")
             
-            await self.page.wait_for_timeout(1000)
+            await title_input.click()
+            await title_input.clear()
+            await title_input.fill(title)
+            print(f"✅ タイトル入力完了: {selector}")
             
             # 3. 本文入力（ProseMirrorエディタ用の特別処理）
             print("📝 本文を入力中...")
@@ -182,43 +503,33 @@ class NoteAutoPoster:
                 '.ProseMirror[data-placeholder]'
             ]
             
-            content_input = None
-            for selector in prosemirror_selectors:
-                try:
-                    content_input = self.page.locator(selector).first
-                    if await content_input.is_visible():
-                        # エディタをクリックしてフォーカス
-                        await content_input.click()
-                        await self.page.wait_for_timeout(500)
-                        
-                        # 既存の内容をクリア（Ctrl+A -> Delete）
-                        await self.page.keyboard.press('Meta+a')  # Mac用（Ctrl+a for Windows）
-                        await self.page.wait_for_timeout(200)
-                        await self.page.keyboard.press('Delete')
-                        await self.page.wait_for_timeout(500)
-                        
-                        # 本文を入力
-                        await self.page.keyboard.type(content)
-                        print(f"✅ 本文入力完了: {selector}")
-                        content_input = True
-                        break
-                except Exception as e:
-                    print(f"⚠️ 本文入力試行失敗: {selector} - {e}")
-                    continue
-            
+            content_input, selector = await self._find_visible(prosemirror_selectors, "本文エディタ", timeout=5000)
             if content_input is None:
                 raise Exception("本文入力欄が見つかりません")
             
-            await self.page.wait_for_timeout(1000)
+            # エディタをクリックしてフォーカスし、既存の内容をクリア
+            await self._clear_editor(content_input)
+            
+            # 本文を入力（一括挿入 → 読み戻し検証 → 失敗時はタイプ入力）
+            body_saved = self._arm_draft_saved_signal()
+            await self._insert_body(content_input, content)
+            print(f"✅ 本文入力完了: {selector}")
+            
+            await self._wait_for_any("本文保存", {
+                '下書き保存レスポンス': body_saved
+            }, timeout=5000)
             
             # 4. アイキャッチ設定（キーワードベース）
             print("🖼️ アイキャッチ設定開始...")
+            eyecatch_saved = self._arm_draft_saved_signal()
             await self.set_eyecatch_image(title, content)
             
             # 5. 公開に進む
             print("📢 公開処理開始...")
             print("⏳ アイキャッチ設定完了を確実に待機してから公開に進みます...")
-            await self.page.wait_for_timeout(8000)  # アイキャッチ保存完了を十分に待つ（延長）
+            await self._wait_for_any("公開前の保存完了", {
+                '下書き保存レスポンス': eyecatch_saved
+            }, timeout=8000)
             
             # 公開処理をリトライ機能付きで実行
             return await self._publish_with_retry()
@@ -232,6 +543,330 @@ class NoteAutoPoster:
                 pass
             return False
 
+    async def _wait_for_any(self, label, signals, timeout=10000):
+        """複数のシグナルのうち最初に発火したものを待機（上限時間付き）
+        
+        signals: {シグナル名: タイムアウト(ms)を受け取りコルーチンを返す関数}
+        戻り値: 発火したシグナル名（タイムアウト時はNone）
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = {asyncio.ensure_future(factory(timeout)): name for name, factory in signals.items()}
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                remaining = timeout / 1000 - (loop.time() - start)
+                if remaining <= 0:
+                    break
+                
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        print(f"⚡ {label}: 「{tasks[task]}」で完了 ({loop.time() - start:.1f}秒)")
+                        return tasks[task]
+            
+            print(f"⏱️ {label}: シグナルを検出できず続行 ({loop.time() - start:.1f}秒)")
+            return None
+            
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _find_visible(self, selectors, label, timeout=0, position='first', fallbacks=()):
+        """フォールバックセレクタを同時に評価し、可視要素を返す
+        
+        前回までに成功したセレクタがあれば単独で先に確認し、外れた場合は
+        全候補の可視判定を並列に行い、学習済みの優先順で最初に見えている要素を採用。
+        見つからない場合は timeout(ms) まで全候補の表示を競争で待機し、どれかが見えた時点で
+        改めて優先順で最初に見えている要素を採用する。
+        各候補は可視要素のみに絞り込むため、nth()で順に調べる必要はない。
+        fallbacks は 'img' のような何にでも一致する最後の手段で、selectors がすべて外れた後に
+        記載順で確認するだけにし、学習（優先順位の変更）の対象にはしない。
+        戻り値: (locator, selector) 見つからない場合は (None, None)
+        """
+        registry = self.selector_registry
+        
+        def build(selector):
+            locator = self.page.locator(f"{selector} >> visible=true")
+            return locator.last if position == 'last' else locator.first
+        
+        # 1. 学習済みセレクタを1回だけ確認
+        # （まだ表示途中なだけの可能性があるため、見えなくてもここでは減点せず 2・3 の候補に残す）
+        best = registry.best(label, selectors)
+        if best is not None:
+            locator = build(best)
+            try:
+                if await locator.is_visible():
+                    registry.record_hit(label, best)
+                    print(f"🎯 {label}: {best} (学習済み)")
+                    return locator, best
+            except Exception:
+                pass
+        
+        candidates = [(selector, build(selector)) for selector in registry.order(label, selectors)]
+        
+        async def first_visible():
+            """全候補の可視判定を並列に行い、優先順で最初に見えている候補を返す"""
+            results = await asyncio.gather(
+                *(locator.is_visible() for _, locator in candidates),
+                return_exceptions=True
+            )
+            for (selector, locator), visible in zip(candidates, results):
+                if visible is True:
+                    return selector, locator
+            return None, None
+        
+        # 2. 全候補を並列に確認
+        selector, locator = await first_visible()
+        
+        # 3. 全候補の表示を競争で待機し、どれかが見えたら優先順で選び直す（先着の候補をそのまま使わない）
+        if selector is None and timeout:
+            winner = await self._wait_for_any(label, {
+                selector: (lambda t, locator=locator: locator.wait_for(state='visible', timeout=t))
+                for selector, locator in candidates
+            }, timeout=timeout)
+            if winner is not None:
+                selector, locator = await first_visible()
+                if selector is None:
+                    selector, locator = winner, dict(candidates)[winner]
+        
+        if selector is not None:
+            # 学習済みセレクタ以外が採用された場合だけ、学習済みセレクタを減点する
+            if best is not None and selector != best:
+                registry.record_miss(label, best)
+            registry.record_hit(label, selector)
+            print(f"🎯 {label}: {selector}")
+            return locator, selector
+        
+        # 4. 最後の手段のセレクタを記載順に確認（学習しない）
+        for selector in fallbacks:
+            locator = build(selector)
+            try:
+                if await locator.is_visible():
+                    print(f"🎯 {label}: {selector} (最後の手段)")
+                    return locator, selector
+            except Exception:
+                pass
+        
+        print(f"⚠️ {label}: {len(selectors) + len(fallbacks)}候補すべて見つかりません")
+        return None, None
+
+    def _visible_signal(self, selector, timeout):
+        """要素が表示されるまで待機するシグナル"""
+        return self.page.locator(selector).first.wait_for(state='visible', timeout=timeout)
+
+    @staticmethod
+    def _is_draft_save_response(response):
+        """下書き保存APIの成功レスポンスか"""
+        return '/text_notes' in response.url and response.request.method in ('POST', 'PUT') and response.ok
+
+    def _arm_draft_saved_signal(self):
+        """下書き保存APIのレスポンス待ちを今すぐ開始し、_wait_for_any 用のシグナルを返す
+        
+        保存を起こす操作より前に呼んでおくことで、操作中にすでに完了した保存も取りこぼさない。
+        """
+        saved = asyncio.get_running_loop().create_future()
+        
+        def on_response(response):
+            if not saved.done() and self._is_draft_save_response(response):
+                saved.set_result(response.url)
+        
+        self.page.on('response', on_response)
+        saved.add_done_callback(lambda _: self.page.remove_listener('response', on_response))
+        return lambda timeout: saved
+
+    def _eyecatch_loaded_signal(self, timeout):
+        """アイキャッチ<img>の読み込み完了を待機するシグナル"""
+        return self.page.wait_for_function(
+            f"() => ({DOM_STATE_PROBE_JS})().eyecatchLoaded",
+            timeout=timeout
+        )
+
+    def _dialogs_closed_signal(self, timeout):
+        """表示中のダイアログ・モーダルがすべて閉じるまで待機するシグナル"""
+        return self.page.wait_for_function(
+            f"() => ({DOM_STATE_PROBE_JS})().openDialogs.length === 0",
+            timeout=timeout
+        )
+
+    async def _probe_dom_state(self):
+        """編集画面の状態スナップショットを1回のevaluateで取得"""
+        return await self.page.evaluate(DOM_STATE_PROBE_JS)
+
+    async def _insert_body(self, editor, content):
+        """本文をエディタへ入力（一括挿入モード対応）"""
+        mode = self.insert_mode
+        start = asyncio.get_running_loop().time()
+        
+        if mode != 'type':
+            inserted = False
+            try:
+                if mode == 'html':
+                    html_content = self._markdown_to_note_html(content)
+                    inserted = await self._paste_into_editor(editor, content, html_content)
+                elif mode == 'paste':
+                    inserted = await self._paste_into_editor(editor, content)
+                if not inserted:
+                    # ペーストが処理されなかった場合は1回のinsertTextで挿入
+                    await self.page.keyboard.insert_text(content)
+                    mode = 'insert_text'
+                    inserted = True
+            except Exception as e:
+                print(f"⚠️ 一括挿入失敗: {e}")
+            
+            if inserted and await self._verify_editor_content(editor, content):
+                elapsed = asyncio.get_running_loop().time() - start
+                print(f"⚡ 本文一括挿入完了 ({mode}, {len(content)}文字, {elapsed:.2f}秒)")
+                return mode
+            
+            print("⚠️ 一括挿入の検証に失敗したため、タイプ入力にフォールバックします")
+            await self._clear_editor(editor)
+            mode = 'type'
+        
+        await self.page.keyboard.type(content)
+        elapsed = asyncio.get_running_loop().time() - start
+        print(f"⌨️ 本文タイプ入力完了 ({len(content)}文字, {elapsed:.2f}秒)")
+        return mode
+
+    async def _paste_into_editor(self, editor, text, html_content=None):
+        """合成ペーストイベントで本文を一括挿入（エディタが処理した場合True）"""
+        return await editor.evaluate(
+            """(el, [text, html]) => {
+                el.focus();
+                const data = new DataTransfer();
+                data.setData('text/plain', text);
+                if (html) {
+                    data.setData('text/html', html);
+                }
+                const event = new ClipboardEvent('paste', {
+                    clipboardData: data, bubbles: true, cancelable: true
+                });
+                el.dispatchEvent(event);
+                return event.defaultPrevented;
+            }""",
+            [text, html_content]
+        )
+
+    def _markdown_to_note_html(self, content):
+        """記事Markdownを Note エディタ向けHTMLに変換（見出し・引用・段落・URL単体行）"""
+        blocks = []
+        paragraph = []
+        quote = []
+        
+        def flush_paragraph():
+            if paragraph:
+                blocks.append(f"<p>{'<br>'.join(paragraph)}</p>")
+                paragraph.clear()
+        
+        def flush_quote():
+            if quote:
+                blocks.append(f"<blockquote><p>{'<br>'.join(quote)}</p></blockquote>")
+                quote.clear()
+        
+        for raw_line in content.split('\n'):
+            line = raw_line.strip()
+            
+            if line.startswith('>'):
+                flush_paragraph()
+                quote.append(html.escape(line[1:].strip()))
+                continue
+            
+            flush_quote()
+            heading = re.match(r'^(#{1,6})\s+(.*)$', line)
+            
+            if not line:
+                flush_paragraph()
+            elif heading:
+                # Noteの見出しは大見出し(h2)・小見出し(h3)の2種類
+                flush_paragraph()
+                tag = 'h2' if len(heading.group(1)) <= 2 else 'h3'
+                blocks.append(f"<{tag}>{html.escape(heading.group(2))}</{tag}>")
+            elif STANDALONE_URL_RE.fullmatch(line):
+                # URL単体行は埋め込みカードになるよう独立した段落にする
+                flush_paragraph()
+                url = html.escape(line)
+                blocks.append(f'<p><a href="{url}">{url}</a></p>')
+            elif re.fullmatch(r'-{3,}|\*{3,}', line):
+                flush_paragraph()
+                blocks.append('<hr>')
+            else:
+                paragraph.append(html.escape(line))
+        
+        flush_paragraph()
+        flush_quote()
+        
+        return ''.join(blocks)
+
+    async def _clear_editor(self, editor):
+        """エディタの内容をクリア"""
+        await editor.click()
+        await self.page.keyboard.press('ControlOrMeta+a')
+        await self.page.keyboard.press('Delete')
+
+    async def _verify_editor_content(self, editor, content):
+        """エディタの内容を読み戻して入力内容と一致するか確認
+        
+        URL単体行は埋め込みカードに置き換わり文字として残らないため、本文の比較からは外し、
+        リンク先（href・埋め込みのURL属性）か、文字として残ったURL単体行で存在を確認する。
+        """
+        try:
+            snapshot = await editor.evaluate(
+                """el => {
+                    const blocks = el.children.length ? Array.from(el.children) : [el];
+                    const lines = [];
+                    const urls = [];
+                    for (const block of blocks) {
+                        for (const node of [block, ...block.querySelectorAll('a[href], [data-src], [data-url]')]) {
+                            const url = node.getAttribute('href') || node.getAttribute('data-src') || node.getAttribute('data-url');
+                            if (url) {
+                                urls.push(url);
+                            }
+                        }
+                        // 埋め込みカードの中身（タイトル・説明文など）は比較対象にしない
+                        if (!block.matches('figure, iframe') && !block.querySelector('iframe')) {
+                            lines.push(block.innerText);
+                        }
+                    }
+                    return {text: lines.join('\\n'), urls};
+                }"""
+            )
+        except Exception as e:
+            print(f"⚠️ エディタ内容の読み取り失敗: {e}")
+            return False
+        
+        expected = self._normalize_editor_text(content)
+        actual = self._normalize_editor_text(snapshot['text'])
+        actual_urls = {url.rstrip('/') for url in snapshot['urls']}
+        actual_urls.update(url.rstrip('/') for url in self._standalone_urls(snapshot['text']))
+        missing_urls = [url for url in self._standalone_urls(content) if url.rstrip('/') not in actual_urls]
+        
+        if expected == actual and not missing_urls:
+            print(f"✅ 本文検証OK ({len(actual)}文字, URL {len(self._standalone_urls(content))}件)")
+            return True
+        
+        print(f"⚠️ 本文検証NG (期待: {len(expected)}文字, 実際: {len(actual)}文字, 見つからないURL: {len(missing_urls)}件)")
+        return False
+
+    @staticmethod
+    def _standalone_urls(text):
+        """URL単体行のURLを順に返す"""
+        return [line.strip() for line in text.splitlines() if STANDALONE_URL_RE.fullmatch(line.strip())]
+
+    @staticmethod
+    def _normalize_editor_text(text):
+        """比較用にMarkdown記号・URL単体行・空白を除去"""
+        lines = []
+        for line in text.splitlines():
+            if re.fullmatch(r'\s*(-{3,}|\*{3,})\s*', line) or STANDALONE_URL_RE.fullmatch(line.strip()):
+                continue
+            line = re.sub(r'^\s*(#{1,6}|>)\s*', '', line)
+            lines.append(line)
+        return re.sub(r'\s+', '', ''.join(lines))
+
     async def set_eyecatch_image(self, title, content):
         """アイキャッチ画像設定（シンプルキーワード抽出版）"""
         try:
@@ -249,100 +884,50 @@ class NoteAutoPoster:
                 'svg[data-src="/icons/imageAdd.svg"]'
             ]
             
-            eyecatch_clicked = False
-            for selector in eyecatch_button_selectors:
-                try:
-                    button = self.page.locator(selector).first
-                    if await button.is_visible():
-                        await button.click()
-                        eyecatch_clicked = True
-                        print(f"✅ アイキャッチボタンクリック: {selector}")
-                        break
-                except Exception as e:
-                    print(f"⚠️ アイキャッチボタン試行失敗: {selector} - {e}")
-                    continue
-            
-            if not eyecatch_clicked:
+            button, selector = await self._find_visible(eyecatch_button_selectors, "アイキャッチボタン", timeout=5000)
+            if button is None:
                 print("⚠️ アイキャッチボタンが見つかりません。スキップします。")
                 return
             
-            await self.page.wait_for_timeout(2000)
+            await button.click()
+            print(f"✅ アイキャッチボタンクリック: {selector}")
             
             # 2. 「記事にあう画像を選ぶ」ボタンをクリック
             print("🖼️ 「記事にあう画像を選ぶ」を選択中...")
-            await self.page.wait_for_timeout(2000)
-            
             select_image_selectors = [
                 'text=記事にあう画像を選ぶ',
-                ':has-text("記事にあう画像を選ぶ")',
-                'div:has-text("記事にあう画像を選ぶ")',
                 'button:has-text("記事にあう画像を選ぶ")',
                 '[role="button"]:has-text("記事にあう画像を選ぶ")'
             ]
             
-            select_clicked = False
-            for selector in select_image_selectors:
-                try:
-                    # まず要素が存在するかチェック
-                    elements = self.page.locator(selector)
-                    count = await elements.count()
-                    print(f"🔍 「{selector}」で見つかった要素数: {count}")
-                    
-                    if count > 0:
-                        element = elements.first
-                        if await element.is_visible():
-                            await element.click()
-                            select_clicked = True
-                            print(f"✅ 「記事にあう画像を選ぶ」クリック完了: {selector}")
-                            break
-                        else:
-                            print(f"⚠️ 要素は存在するが見えません: {selector}")
-                    else:
-                        print(f"⚠️ 要素が見つかりません: {selector}")
-                        
-                except Exception as e:
-                    print(f"⚠️ 「記事にあう画像を選ぶ」試行失敗: {selector} - {e}")
-                    continue
-            
-            if not select_clicked:
+            # :has-text は文言を含む祖先要素（html・body・外枠のdiv）にも一致するため最後の手段にする
+            element, selector = await self._find_visible(
+                select_image_selectors, "「記事にあう画像を選ぶ」", timeout=5000,
+                fallbacks=['div:has-text("記事にあう画像を選ぶ")', ':has-text("記事にあう画像を選ぶ")']
+            )
+            if element is None:
                 print("❌ 「記事にあう画像を選ぶ」ボタンが見つかりません。スキップします。")
                 return
             
-            await self.page.wait_for_timeout(2000)
+            await element.click()
+            print(f"✅ 「記事にあう画像を選ぶ」クリック完了: {selector}")
             
             # 3. 🔍検索アイコンをクリックして検索入力欄を表示
             print("🔍 検索アイコンをクリックして検索機能を開始...")
-            await self.page.wait_for_timeout(2000)
-            
             search_icon_selectors = [
                 'svg path[d*="M14.71 14H15.5L20.49 19"]',  # 具体的なSVGパス
                 'button:has(svg path[d*="M14.71 14H15.5"])',  # SVGを含むボタン
                 'svg[role="img"]:has(path[fill-rule="evenodd"])',
-                '[aria-label*="検索"]',
-                'button svg path[fill-rule="evenodd"]'
+                '[aria-label*="検索"]'
             ]
             
-            search_icon_clicked = False
-            for selector in search_icon_selectors:
-                try:
-                    search_icons = self.page.locator(selector)
-                    count = await search_icons.count()
-                    print(f"🔍 検索アイコン「{selector}」で見つかった要素数: {count}")
-                    
-                    if count > 0:
-                        search_icon = search_icons.first
-                        if await search_icon.is_visible():
-                            await search_icon.click()
-                            search_icon_clicked = True
-                            print(f"✅ 検索アイコンクリック完了: {selector}")
-                            break
-                except Exception as e:
-                    print(f"⚠️ 検索アイコン試行失敗: {selector} - {e}")
-                    continue
-            
-            if search_icon_clicked:
-                await self.page.wait_for_timeout(1500)
-                print("✅ 検索入力欄の表示を待機...")
+            search_icon, selector = await self._find_visible(
+                search_icon_selectors, "検索アイコン", timeout=5000,
+                fallbacks=['button svg path[fill-rule="evenodd"]']
+            )
+            if search_icon is not None:
+                await search_icon.click()
+                print(f"✅ 検索アイコンクリック完了: {selector}")
             
             # 4. キーワードで画像検索
             print(f"🔍 キーワード「{keyword}」で画像検索中...")
@@ -350,31 +935,37 @@ class NoteAutoPoster:
                 'input[placeholder="キーワード検索"]',
                 'input[aria-label*="みんなのフォトギャラリーから検索"]',
                 'input.sc-720f88eb-4.dACgdT',
-                'input[placeholder*="検索"]',
-                'input[type="text"]'
+                'input[placeholder*="検索"]'
             ]
             
-            search_input_found = False
-            for selector in search_input_selectors:
-                try:
-                    search_input = self.page.locator(selector).first
-                    if await search_input.is_visible():
-                        await search_input.clear()
-                        await search_input.fill(keyword)
-                        await search_input.press('Enter')
-                        search_input_found = True
-                        print(f"✅ キーワード検索完了: {selector}")
-                        break
-                except Exception as e:
-                    print(f"⚠️ 検索入力試行失敗: {selector} - {e}")
-                    continue
-            
-            if not search_input_found:
+            search_input, selector = await self._find_visible(
+                search_input_selectors, "検索入力欄", timeout=3000, fallbacks=['input[type="text"]']
+            )
+            search_input_found = search_input is not None
+            if search_input_found:
+                await search_input.clear()
+                await search_input.fill(keyword)
+                await search_input.press('Enter')
+                print(f"✅ キーワード検索完了: {selector}")
+            else:
                 print("⚠️ 検索入力欄が見つかりません。キーワードなしで画像選択を試行します。")
             
             # 5. 画像が読み込まれるまで待機
             print("🖼️ 画像の読み込みを待機中...")
-            await self.page.wait_for_timeout(4000)
+            if search_input_found:
+                await self._wait_for_any("画像検索結果", {
+                    '検索結果レスポンス': lambda t: self.page.wait_for_response(
+                        lambda r: 'search' in r.url and r.request.resource_type in ('xhr', 'fetch'),
+                        timeout=t
+                    )
+                }, timeout=4000)
+            await self._wait_for_any("検索画像の読み込み", {
+                '画像読み込み完了': lambda t: self.page.wait_for_function(
+                    """() => Array.from(document.querySelectorAll('[role="dialog"] img, img[src*="assets.st-note.com"]'))
+                        .some(img => img.complete && img.naturalWidth > 0)""",
+                    timeout=t
+                )
+            }, timeout=4000)
             
             # 6. 利用可能な画像を探して選択
             print("🖼️ 利用可能な画像を探します...")
@@ -384,57 +975,31 @@ class NoteAutoPoster:
                 'img[src*="note.com"]',
                 'img.sc-a7ee00d5-4',
                 'img[width="400"]',
-                'img[alt*="画像"]',
-                'img'
+                'img[alt*="画像"]'
             ]
             
-            image_selected = False
-            for selector in image_selectors:
-                try:
-                    images = self.page.locator(selector)
-                    count = await images.count()
-                    print(f"🖼️ 「{selector}」で見つかった画像数: {count}")
-                    
-                    if count > 0:
-                        # シンプルな画像選択
-                        best_image_index = await self._select_image_simple(images, keyword)
-                        
-                        try:
-                            image = images.nth(best_image_index)
-                            if await image.is_visible():
-                                src = await image.get_attribute('src')
-                                print(f"🖼️ 選択画像: {src}")
-                                
-                                await image.click()
-                                image_selected = True
-                                print(f"✅ 画像選択完了: {selector}")
-                                break
-                        except Exception as e:
-                            print(f"⚠️ 画像クリック失敗: {e}")
-                            # 超シンプルフォールバック: 最初の画像
-                            try:
-                                first_image = images.first
-                                if await first_image.is_visible():
-                                    await first_image.click()
-                                    image_selected = True
-                                    print(f"✅ フォールバック画像選択完了: {selector}")
-                                    break
-                            except Exception as e2:
-                                print(f"⚠️ フォールバック画像クリック失敗: {e2}")
-                                continue
-                        
-                        if image_selected:
-                            break
-                            
-                except Exception as e:
-                    print(f"⚠️ 画像選択試行失敗: {selector} - {e}")
-                    continue
-            
-            if not image_selected:
+            first_image, selector = await self._find_visible(image_selectors, "検索画像", fallbacks=['img'])
+            if first_image is None:
                 print("⚠️ 選択可能な画像が見つかりません。アイキャッチなしで進行します。")
                 return
             
-            await self.page.wait_for_timeout(2000)
+            images = self.page.locator(selector)
+            try:
+                # シンプルな画像選択
+                best_image_index = await self._select_image_simple(images, keyword)
+                image = images.nth(best_image_index)
+                if not await image.is_visible():
+                    image = first_image
+                
+                src = await image.get_attribute('src')
+                print(f"🖼️ 選択画像: {src}")
+                await image.click()
+                print(f"✅ 画像選択完了: {selector}")
+            except Exception as e:
+                print(f"⚠️ 画像クリック失敗: {e}")
+                # 超シンプルフォールバック: 最初の画像
+                await first_image.click()
+                print(f"✅ フォールバック画像選択完了: {selector}")
             
             # 7. 「この画像を挿入」ボタンをクリック
             insert_button_selectors = [
@@ -443,64 +1008,38 @@ class NoteAutoPoster:
                 'button:has-text("挿入")'
             ]
             
-            insert_clicked = False
-            for selector in insert_button_selectors:
-                try:
-                    insert_button = self.page.locator(selector).first
-                    if await insert_button.is_visible():
-                        await insert_button.click()
-                        insert_clicked = True
-                        print(f"✅ 画像挿入ボタンクリック: {selector}")
-                        break
-                except Exception as e:
-                    print(f"⚠️ 画像挿入ボタン試行失敗: {selector} - {e}")
-                    continue
-            
-            if not insert_clicked:
+            insert_button, selector = await self._find_visible(insert_button_selectors, "画像挿入ボタン", timeout=4000)
+            if insert_button is None:
                 print("⚠️ 画像挿入ボタンが見つかりません。スキップします。")
                 return
             
-            await self.page.wait_for_timeout(2000)
+            await insert_button.click()
+            print(f"✅ 画像挿入ボタンクリック: {selector}")
             
             # 8. 「保存」ボタンをクリック
             print("💾 画像クロップ画面の保存ボタンをクリック中...")
-            await self.page.wait_for_timeout(2000)
-            
             save_button_selectors = [
                 'button:has-text("保存")',
                 'span:has-text("保存")',
                 '#\\:rj\\:',
                 'button[class*="font-bold"]:has-text("保存")',
-                '[role="button"]:has-text("保存")',
-                'div:has-text("保存"):last-child'
+                '[role="button"]:has-text("保存")'
             ]
             
-            save_clicked = False
-            for selector in save_button_selectors:
-                try:
-                    save_buttons = self.page.locator(selector)
-                    count = await save_buttons.count()
-                    print(f"💾 「{selector}」で見つかった保存ボタン数: {count}")
-                    
-                    if count > 0:
-                        save_button = save_buttons.last
-                        if await save_button.is_visible():
-                            await self.page.wait_for_timeout(1000)
-                            await save_button.click()
-                            save_clicked = True
-                            print(f"✅ 保存ボタンクリック完了: {selector}")
-                            break
-                        else:
-                            print(f"💾 保存ボタンは存在するが見えません: {selector}")
-                            
-                except Exception as e:
-                    print(f"⚠️ 保存ボタン試行失敗: {selector} - {e}")
-                    continue
+            save_button, selector = await self._find_visible(
+                save_button_selectors, "保存ボタン", timeout=4000, position='last',
+                fallbacks=['div:has-text("保存"):last-child']
+            )
+            save_clicked = save_button is not None
+            if save_clicked:
+                draft_saved = self._arm_draft_saved_signal()
+                await save_button.click()
+                print(f"✅ 保存ボタンクリック完了: {selector}")
             
             if save_clicked:
                 print("✅ アイキャッチ設定完了！")
                 print("⏳ 画像の読み込み完了を待機中...")
-                await self._wait_for_eyecatch_completion()
+                await self._wait_for_eyecatch_completion(draft_saved)
             else:
                 print("⚠️ 保存ボタンが見つかりませんでした")
                 
@@ -570,63 +1109,24 @@ class NoteAutoPoster:
 
 
 
-    async def _wait_for_eyecatch_completion(self):
-        """アイキャッチ設定完了を確実に待機（最適化版）"""
+    async def _wait_for_eyecatch_completion(self, draft_saved):
+        """アイキャッチ設定完了を確実に待機（イベント駆動版）
+        
+        draft_saved は保存ボタンのクリック前に _arm_draft_saved_signal で用意したシグナル。
+        """
         try:
             print("⏳ アイキャッチ設定完了を確実に待機中...")
             
-            # まず十分な基本待機時間を設ける
-            print("⏳ 基本的な画像処理時間を待機中...")
-            await self.page.wait_for_timeout(5000)  # 2000ms → 5000ms に延長
-            
-            # アイキャッチ関連のモーダルが閉じるまで待機（試行回数を削減）
-            max_wait_attempts = 8  # 20回 → 8回に削減
-            wait_interval = 2000   # 1000ms → 2000ms に延長
+            # アイキャッチ関連のモーダルが閉じるまで待機
+            await self._wait_for_any("アイキャッチモーダル", {
+                'ダイアログ消失': self._dialogs_closed_signal
+            }, timeout=16000)
             
-            for attempt in range(max_wait_attempts):
-                try:
-                    modal_selectors = [
-                        '[role="dialog"]',
-                        '.modal',
-                        '.o-modal',
-                        ':has-text("画像を選ぶ")',
-                        ':has-text("この画像を挿入")',
-                        ':has-text("保存")',
-                        ':has-text("アイキャッチ")'
-                    ]
-                    
-                    modal_exists = False
-                    for selector in modal_selectors:
-                        try:
-                            modal_elements = self.page.locator(selector)
-                            count = await modal_elements.count()
-                            if count > 0:
-                                for i in range(count):
-                                    modal = modal_elements.nth(i)
-                                    if await modal.is_visible():
-                                        modal_exists = True
-                                        print(f"⏳ アイキャッチモーダルが残っています: {selector} (試行 {attempt + 1}/{max_wait_attempts})")
-                                        break
-                            if modal_exists:
-                                break
-                        except:
-                            continue
-                    
-                    if not modal_exists:
-                        print("✅ アイキャッチ関連のモーダルが閉じました")
-                        break
-                    
-                    # 待機間隔を延長
-                    await self.page.wait_for_timeout(wait_interval)
-                    
-                except Exception as e:
-                    print(f"⚠️ モーダル確認エラー (試行 {attempt + 1}): {e}")
-                    await self.page.wait_for_timeout(wait_interval)
-                    continue
-            
-            # 最終的な画像読み込み完了待機（延長）
-            print("⏳ 最終的な画像読み込み完了を待機中...")
-            await self.page.wait_for_timeout(8000)  # 5000ms → 8000ms に延長
+            # アイキャッチ画像の読み込み・下書き保存を待機
+            await self._wait_for_any("アイキャッチ画像", {
+                'アイキャッチ画像読み込み完了': self._eyecatch_loaded_signal,
+                '下書き保存レスポンス': draft_saved
+            }, timeout=8000)
             
             # アイキャッチ画像が実際に読み込まれたか確認
             eyecatch_loaded = await self._verify_eyecatch_loaded()
@@ -641,37 +1141,28 @@ class NoteAutoPoster:
             
         except Exception as e:
             print(f"⚠️ アイキャッチ完了待機エラー: {e}")
-            await self.page.wait_for_timeout(5000)  # エラー時も延長
 
     async def _verify_article_ready(self):
         """記事編集画面が投稿準備完了状態かを確認"""
         try:
             print("🔍 記事編集画面の状態を確認中...")
             
+            state = await self._probe_dom_state()
             ready_indicators = [
-                'textarea[placeholder="記事タイトル"]',
-                '.ProseMirror',
-                'span:has-text("公開に進む")',
-                'button:has-text("公開に進む")'
+                state['titlePresent'],
+                state['editorPresent'],
+                state['publishButtonPresent']
             ]
-            
-            ready_count = 0
-            for selector in ready_indicators:
-                try:
-                    elements = self.page.locator(selector)
-                    count = await elements.count()
-                    if count > 0:
-                        element = elements.first
-                        if await element.is_visible():
-                            ready_count += 1
-                except:
-                    continue
+            ready_count = sum(ready_indicators)
+            detail = (f"タイトル{state['titleLength']}文字, 本文{state['bodyLength']}文字, "
+                      f"公開ボタン{'有効' if state['publishButtonEnabled'] else '無効'}, "
+                      f"ダイアログ{len(state['openDialogs'])}件")
             
             if ready_count >= 2:
-                print(f"✅ 記事編集画面準備完了 ({ready_count}/{len(ready_indicators)} 要素確認)")
+                print(f"✅ 記事編集画面準備完了 ({ready_count}/{len(ready_indicators)} 要素確認: {detail})")
                 return True
             else:
-                print(f"⚠️ 記事編集画面の準備が不完全 ({ready_count}/{len(ready_indicators)} 要素確認)")
+                print(f"⚠️ 記事編集画面の準備が不完全 ({ready_count}/{len(ready_indicators)} 要素確認: {detail})")
                 return False
                 
         except Exception as e:
@@ -683,22 +1174,15 @@ class NoteAutoPoster:
         try:
             print("🔍 アイキャッチ画像の読み込み状況を確認中...")
             
-            eyecatch_area_selectors = [
-                '.editor-eyecatch img',
-                '[data-testid="eyecatch-image"]',
-                '.eyecatch-image',
-                'img[src*="assets.st-note.com"]'
-            ]
+            state = await self._probe_dom_state()
             
-            for selector in eyecatch_area_selectors:
-                try:
-                    eyecatch_images = self.page.locator(selector)
-                    count = await eyecatch_images.count()
-                    if count > 0:
-                        print(f"✅ アイキャッチ画像が読み込まれました: {selector}")
-                        return True
-                except Exception:
-                    continue
+            if state['eyecatchLoaded']:
+                print("✅ アイキャッチ画像が読み込まれました")
+                return True
+            
+            if state['eyecatchPresent'] or state['noteImageCount'] > 0:
+                print(f"✅ アイキャッチ画像を確認しました (note画像 {state['noteImageCount']}件)")
+                return True
                     
             print("⚠️ アイキャッチ画像の読み込みが確認できませんが続行します")
             return False
@@ -713,33 +1197,10 @@ class NoteAutoPoster:
             print("🔍 検索ダイアログをチェック中...")
             
             # 検索関連のダイアログ・モーダルを検出
-            search_dialog_selectors = [
-                ':has-text("検索")',
-                ':has-text("キーワード検索")',
-                ':has-text("みんなのフォトギャラリーから検索")',
-                '[role="dialog"]:has-text("検索")',
-                '.modal:has-text("検索")',
-                '.o-modal:has-text("検索")',
-                'input[placeholder*="検索"]',
-                'input[placeholder="キーワード検索"]'
-            ]
-            
-            dialog_found = False
-            for selector in search_dialog_selectors:
-                try:
-                    dialogs = self.page.locator(selector)
-                    count = await dialogs.count()
-                    if count > 0:
-                        for i in range(count):
-                            dialog = dialogs.nth(i)
-                            if await dialog.is_visible():
-                                dialog_found = True
-                                print(f"🔍 検索ダイアログを発見: {selector}")
-                                break
-                        if dialog_found:
-                            break
-                except Exception:
-                    continue
+            state = await self._probe_dom_state()
+            dialog_found = state['searchOpen']
+            if dialog_found:
+                print(f"🔍 検索ダイアログを発見 (表示中のダイアログ {len(state['openDialogs'])}件)")
             
             if not dialog_found:
                 print("✅ 検索ダイアログは見つかりませんでした")
@@ -777,19 +1238,12 @@ class NoteAutoPoster:
                 'button[aria-label="Close"]'
             ]
             
-            for selector in close_button_selectors:
-                try:
-                    close_buttons = self.page.locator(selector)
-                    count = await close_buttons.count()
-                    if count > 0:
-                        close_button = close_buttons.first
-                        if await close_button.is_visible():
-                            await close_button.click()
-                            await self.page.wait_for_timeout(1000)
-                            print(f"✅ 閉じるボタンで検索ダイアログを閉じました: {selector}")
-                            return
-                except Exception:
-                    continue
+            close_button, selector = await self._find_visible(close_button_selectors, "検索ダイアログ閉じるボタン")
+            if close_button is not None:
+                await close_button.click()
+                await self.page.wait_for_timeout(1000)
+                print(f"✅ 閉じるボタンで検索ダイアログを閉じました: {selector}")
+                return
             
             print("⚠️ 検索ダイアログを閉じることができませんでした")
             
@@ -802,11 +1256,14 @@ class NoteAutoPoster:
         
         for attempt in range(max_retry):
             print(f"📢 公開処理試行 {attempt + 1}/{max_retry}")
+            # この試行中に完了した下書き保存を、リトライ前・エラー後の待機で取りこぼさないよう先に待ち始める
+            draft_saved = self._arm_draft_saved_signal()
             
             try:
                 current_url = self.page.url
                 print(f"🌐 公開前のURL: {current_url}")
                 
+                self._reset_dialog_reports()
                 publish_success = await self._click_publish_button()
                 
                 if not publish_success:
@@ -814,14 +1271,22 @@ class NoteAutoPoster:
                     continue
                 
                 print("⏳ 公開処理を待機中...")
-                await self.page.wait_for_timeout(3000)
+                await self._wait_for_any("公開画面", {
+                    '公開設定画面へ遷移': lambda t: self.page.wait_for_url('**/publish**', timeout=t),
+                    'ダイアログ表示': lambda t: self._visible_signal('[role="dialog"], [role="alertdialog"]', t),
+                    '投稿ボタン表示': lambda t: self._visible_signal('button:has-text("投稿する")', t),
+                    'エラーダイアログ通知': lambda t: asyncio.wait_for(self.error_dialog_event.wait(), t / 1000)
+                }, timeout=5000)
                 
                 error_handled = await self._handle_publish_error()
                 
                 if error_handled:
                     print("⚠️ エラーが発生しました。リトライします...")
-                    print("⏳ アイキャッチ設定が完了するまで追加の待機時間を設けます...")
-                    await self.page.wait_for_timeout(5000)
+                    print("⏳ アイキャッチ設定が完了するまで待機します...")
+                    await self._wait_for_any("リトライ前の保存完了", {
+                        'アイキャッチ画像読み込み完了': self._eyecatch_loaded_signal,
+                        '下書き保存レスポンス': draft_saved
+                    }, timeout=5000)
                     continue
                 
                 return await self._complete_publishing()
@@ -829,8 +1294,10 @@ class NoteAutoPoster:
             except Exception as e:
                 print(f"⚠️ 公開処理エラー (試行 {attempt + 1}): {e}")
                 if attempt < max_retry - 1:
-                    print("⏳ エラー後の回復待機時間...")
-                    await self.page.wait_for_timeout(5000)
+                    print("⏳ エラー後の回復を待機中...")
+                    await self._wait_for_any("エラー後の回復", {
+                        '下書き保存レスポンス': draft_saved
+                    }, timeout=5000)
                     continue
                 else:
                     return False
@@ -848,24 +1315,14 @@ class NoteAutoPoster:
             '[data-testid="publish-button"]'
         ]
         
-        for selector in publish_button_selectors:
-            try:
-                publish_buttons = self.page.locator(selector)
-                count = await publish_buttons.count()
-                print(f"📢 「{selector}」で見つかった公開ボタン数: {count}")
-                
-                if count > 0:
-                    publish_button = publish_buttons.first
-                    if await publish_button.is_visible():
-                        await publish_button.click()
-                        print(f"✅ 公開ボタンクリック完了: {selector}")
-                        return True
-                    else:
-                        print(f"📢 公開ボタンは存在するが見えません: {selector}")
-                        
-            except Exception as e:
-                print(f"⚠️ 公開ボタン試行失敗: {selector} - {e}")
-                continue
+        try:
+            publish_button, selector = await self._find_visible(publish_button_selectors, "公開ボタン", timeout=5000)
+            if publish_button is not None:
+                await publish_button.click()
+                print(f"✅ 公開ボタンクリック完了: {selector}")
+                return True
+        except Exception as e:
+            print(f"⚠️ 公開ボタン試行失敗: {e}")
         
         try:
             await self.page.keyboard.press('Meta+Enter')
@@ -876,77 +1333,53 @@ class NoteAutoPoster:
             return False
 
     async def _handle_publish_error(self):
-        """公開エラーダイアログの処理（強化版）"""
+        """公開エラーダイアログの処理（MutationObserver通知ベース）"""
         try:
-            error_dialog_selectors = [
-                ':has-text("タイトル、本文を入力してください")',
-                ':has-text("入力してください")',
-                ':has-text("必須項目")',
-                ':has-text("エラー")',
-                ':has-text("読み込み")',
-                ':has-text("準備中")',
-                '.error-dialog',
-                '[role="dialog"]',
-                '.modal:has-text("エラー")',
-                '.o-modal:has-text("入力")',
-                '[role="alertdialog"]'
-            ]
+            print("🔍 エラーダイアログを確認中...")
             
-            print("🔍 エラーダイアログを詳細チェック中...")
+            error_dialog = next((d for d in reversed(self.dialog_reports) if self._is_publish_error(d)), None)
             
-            for selector in error_dialog_selectors:
-                try:
-                    error_dialogs = self.page.locator(selector)
-                    count = await error_dialogs.count()
-                    
-                    if count > 0:
-                        print(f"🚨 エラーダイアログ候補発見: {selector} (数: {count})")
-                        
-                        for i in range(count):
-                            error_dialog = error_dialogs.nth(i)
-                            if await error_dialog.is_visible():
-                                print(f"🚨 エラーダイアログを確認: {selector} (要素 {i+1})")
-                                
-                                try:
-                                    error_text = await error_dialog.text_content()
-                                    print(f"🚨 エラー内容: {error_text[:100]}...")
-                                    
-                                    if any(pattern in error_text for pattern in [
-                                        "タイトル、本文を入力",
-                                        "入力してください",
-                                        "必須項目",
-                                        "読み込み中",
-                                        "準備中"
-                                    ]):
-                                        print("🚨 記事準備不完全エラーを検出")
-                                        
-                                        close_success = await self._close_error_dialog_enhanced()
-                                        
-                                        if close_success:
-                                            print("✅ エラーダイアログを閉じました")
-                                            await self.page.wait_for_timeout(3000)
-                                            return True
-                                        else:
-                                            print("⚠️ エラーダイアログを閉じることができませんでした")
-                                            return True
-                                except Exception as e:
-                                    print(f"⚠️ エラーテキスト取得失敗: {e}")
-                                
-                                return True
-                            
-                except Exception as e:
-                    print(f"⚠️ エラーダイアログ検出失敗: {selector} - {e}")
-                    continue
+            if error_dialog is None and not self.dialog_reports:
+                # 通知が届かない場合（バインディング未設定など）に備えてDOMプローブで1回だけ確認
+                state = await self._probe_dom_state()
+                error_dialog = next((d for d in state['openDialogs'] if self._is_publish_error(d)), None)
             
-            print("✅ エラーダイアログは検出されませんでした")
-            return False
+            if error_dialog is None:
+                print("✅ エラーダイアログは検出されませんでした")
+                return False
+            
+            print(f"🚨 エラー内容: {error_dialog['text'][:100]}...")
+            print("🚨 記事準備不完全エラーを検出")
+            
+            close_success = await self._close_error_dialog_enhanced(error_dialog)
+            
+            if close_success:
+                print("✅ エラーダイアログを閉じました")
+                await self._wait_for_any("エラーダイアログ", {
+                    'ダイアログ消失': self._dialogs_closed_signal
+                }, timeout=3000)
+            else:
+                print("⚠️ エラーダイアログを閉じることができませんでした")
+            return True
             
         except Exception as e:
             print(f"⚠️ エラーハンドリング中にエラー: {e}")
             return False
 
-    async def _close_error_dialog_enhanced(self):
+    async def _close_error_dialog_enhanced(self, dialog=None):
         """エラーダイアログの「閉じる」ボタンをクリック（強化版）"""
+        # 通知されたダイアログのボタン文言から閉じるボタンを直接クリック
+        if dialog is not None:
+            for button_text in dialog.get('buttons', []):
+                if not any(text in button_text for text in CLOSE_BUTTON_TEXTS):
+                    continue
+                try:
+                    await self.page.get_by_role('button', name=button_text, exact=True).last.click(timeout=3000)
+                    print(f"✅ 閉じるボタンクリック完了: 「{button_text}」")
+                    return True
+                except Exception as e:
+                    print(f"⚠️ 閉じるボタン「{button_text}」クリック失敗: {e}")
+        
         close_button_selectors = [
             'button:has-text("閉じる")',
             'span:has-text("閉じる")',
@@ -960,7 +1393,10 @@ class NoteAutoPoster:
             '.close-button',
             'button:has-text("×")',
             'button:has-text("✕")',
-            '[role="button"]:has-text("閉じる")',
+            '[role="button"]:has-text("閉じる")'
+        ]
+        # ダイアログ内の任意のボタン（最後の手段、学習しない）
+        close_button_fallbacks = [
             'button[type="button"]',
             '[role="dialog"] button',
             '.modal button'
@@ -968,31 +1404,23 @@ class NoteAutoPoster:
         
         print("🔍 エラーダイアログの閉じるボタンを詳細検索中...")
         
-        for selector in close_button_selectors:
-            try:
-                close_buttons = self.page.locator(selector)
-                count = await close_buttons.count()
+        try:
+            close_button, selector = await self._find_visible(
+                close_button_selectors, "エラーダイアログ閉じるボタン", fallbacks=close_button_fallbacks
+            )
+            if close_button is not None:
+                try:
+                    button_text = await close_button.text_content()
+                    print(f"🔍 ボタンテキスト: {button_text}")
+                except:
+                    pass
                 
-                if count > 0:
-                    print(f"🔍 閉じるボタン候補: {selector} (数: {count})")
-                    
-                    for i in range(count):
-                        close_button = close_buttons.nth(i)
-                        if await close_button.is_visible():
-                            try:
-                                button_text = await close_button.text_content()
-                                print(f"🔍 ボタンテキスト: {button_text}")
-                            except:
-                                pass
-                            
-                            await close_button.click()
-                            print(f"✅ 閉じるボタンクリック完了: {selector} (ボタン {i+1})")
-                            await self.page.wait_for_timeout(1500)
-                            return True
-                    
-            except Exception as e:
-                print(f"⚠️ 閉じるボタン試行失敗: {selector} - {e}")
-                continue
+                await close_button.click()
+                print(f"✅ 閉じるボタンクリック完了: {selector}")
+                await self.page.wait_for_timeout(1500)
+                return True
+        except Exception as e:
+            print(f"⚠️ 閉じるボタン試行失敗: {e}")
         
         print("🔍 ESCキーでダイアログを閉じる試行...")
         try:
@@ -1027,29 +1455,21 @@ class NoteAutoPoster:
                 'button:has-text("投稿する")',
                 'span:has-text("投稿")',
                 'button:has-text("投稿")',
-                '[data-testid="final-publish"]',
-                'button[type="submit"]'
+                '[data-testid="final-publish"]'
             ]
             
             final_publish_found = False
-            for selector in final_publish_selectors:
-                try:
-                    final_buttons = self.page.locator(selector)
-                    count = await final_buttons.count()
-                    print(f"📤 「{selector}」で見つかった最終投稿ボタン数: {count}")
-                    
-                    if count > 0:
-                        final_button = final_buttons.first
-                        if await final_button.is_visible():
-                            await final_button.click()
-                            final_publish_found = True
-                            print(f"✅ 最終投稿ボタンクリック完了: {selector}")
-                            await self.page.wait_for_timeout(3000)
-                            break
-                            
-                except Exception as e:
-                    print(f"⚠️ 最終投稿ボタン試行失敗: {selector} - {e}")
-                    continue
+            try:
+                final_button, selector = await self._find_visible(
+                    final_publish_selectors, "最終投稿ボタン", timeout=5000, fallbacks=['button[type="submit"]']
+                )
+                if final_button is not None:
+                    await final_button.click()
+                    final_publish_found = True
+                    print(f"✅ 最終投稿ボタンクリック完了: {selector}")
+                    await self.page.wait_for_timeout(3000)
+            except Exception as e:
+                print(f"⚠️ 最終投稿ボタン試行失敗: {e}")
             
             if not final_publish_found:
                 print("💡 最終投稿ボタンが見つかりません。記事が既に投稿された可能性があります。")
@@ -1104,19 +1524,11 @@ class NoteAutoPoster:
                 '.a-userIcon[alt="メニュー"]',  # クラス+属性
             ]
             
-            menu_opened = False
-            for selector in user_menu_selectors:
-                try:
-                    menu_button = self.page.locator(selector).first
-                    if await menu_button.is_visible():
-                        await menu_button.click()
-                        menu_opened = True
-                        print(f"✅ ユーザーメニューオープン: {selector}")
-                        await self.page.wait_for_timeout(2000)  # メニュー表示をしっかり待機
-                        break
-                except Exception as e:
-                    print(f"⚠️ メニューオープン試行失敗: {selector} - {e}")
-                    continue
+            menu_button, selector = await self._find_visible(user_menu_selectors, "ユーザーメニュー", timeout=5000)
+            menu_opened = menu_button is not None
+            if menu_opened:
+                await menu_button.click()
+                print(f"✅ ユーザーメニューオープン: {selector}")
             
             if not menu_opened:
                 print("❌ ユーザーメニューが開けませんでした")
@@ -1140,59 +1552,38 @@ class NoteAutoPoster:
                 
                 # より汎用的なセレクタ
                 'span:has-text("ログアウト")',
-                '*:has-text("ログアウト")',
                 
-                # XPath使用（最後の手段）
+                # XPath使用
                 '//span[contains(@class, "m-menuItem__title") and text()="ログアウト"]',
-                '//span[text()="ログアウト"]',
-                '//*[text()="ログアウト"]'
+                '//span[text()="ログアウト"]'
+            ]
+            # 何にでも一致しうる最後の手段（*:has-text は html・body にも一致するため学習しない）
+            logout_fallbacks = [
+                '//*[text()="ログアウト"]',
+                '*:has-text("ログアウト")'
             ]
             
             logout_clicked = False
-            for selector in logout_selectors:
-                try:
-                    print(f"🔍 ログアウトセレクタ試行: {selector}")
-                    
-                    if selector.startswith('//'):
-                        # XPath使用
-                        logout_elements = self.page.locator(f'xpath={selector}')
-                    else:
-                        # CSS セレクタ使用
-                        logout_elements = self.page.locator(selector)
-                    
-                    count = await logout_elements.count()
-                    print(f"🔍 「{selector}」で見つかった要素数: {count}")
+            try:
+                # メニュー表示を待ちつつ全候補を同時に評価
+                logout_element, selector = await self._find_visible(
+                    logout_selectors, "ログアウトボタン", timeout=5000, fallbacks=logout_fallbacks
+                )
+                if logout_element is not None:
+                    element_text = await logout_element.text_content()
+                    element_class = await logout_element.get_attribute('class')
+                    print(f"🔍 要素: text='{element_text}' class='{element_class}'")
                     
-                    if count > 0:
-                        for i in range(count):
-                            try:
-                                logout_element = logout_elements.nth(i)
-                                
-                                # 要素の詳細情報を表示
-                                if await logout_element.is_visible():
-                                    element_text = await logout_element.text_content()
-                                    element_class = await logout_element.get_attribute('class')
-                                    print(f"🔍 要素 {i+1}: text='{element_text}' class='{element_class}'")
-                                    
-                                    if element_text and 'ログアウト' in element_text:
-                                        print(f"🎯 ログアウト要素を発見: {selector} (要素 {i+1})")
-                                        await logout_element.click()
-                                        logout_clicked = True
-                                        print(f"✅ ログアウトクリック完了: {selector}")
-                                        break
-                                else:
-                                    print(f"⚠️ 要素 {i+1} は見えません")
-                                    
-                            except Exception as e:
-                                print(f"⚠️ 要素 {i+1} クリック失敗: {e}")
-                                continue
-                        
-                        if logout_clicked:
-                            break
-                            
-                except Exception as e:
-                    print(f"⚠️ ログアウト試行失敗: {selector} - {e}")
-                    continue
+                    if self._is_logout_text(element_text):
+                        await logout_element.click()
+                        logout_clicked = True
+                        print(f"✅ ログアウトクリック完了: {selector}")
+            except Exception as e:
+                print(f"⚠️ ログアウト試行失敗: {e}")
+            
+            if not logout_clicked:
+                # 採用された要素がログアウトでなかった場合は、全候補の一致要素を順に確認
+                logout_clicked = await self._click_logout_candidates(logout_selectors + logout_fallbacks)
             
             if not logout_clicked:
                 print("❌ ログアウトボタンが見つかりません")
@@ -1341,6 +1732,8 @@ class NoteAutoPoster:
     
     async def close(self):
         """ブラウザクローズ"""
+        self._report_blocked_resources()
+        self.selector_registry.save()
         if self.browser:
             await self.browser.close()
 
@@ -1381,6 +1774,38 @@ class NoteAutoPoster:
         except Exception as e:
             print(f"⚠️ 詳細デバッグ失敗: {e}")
 
+    @staticmethod
+    def _is_logout_text(text):
+        """要素の文言がログアウトそのものか（メニュー全体や html・body のように他の文言も含む要素は除く）"""
+        return bool(text) and ' '.join(text.split()) == 'ログアウト'
+
+    async def _click_logout_candidates(self, selectors):
+        """各セレクタに一致する要素を順に調べ、見えていて文言が「ログアウト」の最初の要素をクリック"""
+        for selector in selectors:
+            elements = self.page.locator(selector)
+            try:
+                count = await elements.count()
+            except Exception as e:
+                print(f"⚠️ 「{selector}」の要素数取得失敗: {e}")
+                continue
+            
+            for i in range(count):
+                try:
+                    element = elements.nth(i)
+                    if not await element.is_visible():
+                        continue
+                    
+                    element_text = await element.text_content()
+                    if self._is_logout_text(element_text):
+                        print(f"🎯 ログアウト要素を発見: {selector} (要素 {i+1})")
+                        await element.click()
+                        print(f"✅ ログアウトクリック完了: {selector}")
+                        return True
+                except Exception as e:
+                    print(f"⚠️ 要素 {i+1} クリック失敗: {e}")
+        
+        return False
+
     async def _logout_with_keyboard(self):
         """キーボードナビゲーションでログアウト"""
         try:
@@ -1504,12 +1929,17 @@ async def main():
         else:
             print("❌ 記事投稿に失敗しました")
         
-        logout_success = await poster.logout()
-        
-        if logout_success:
-            print("✅ ログアウト完了！")
+        if poster.session_file:
+            # ログアウトするとセッションが無効になるため、保存して次回に再利用
+            await poster._save_session()
+            print("🍪 セッション再利用のためログアウトをスキップします")
         else:
-            print("✅ ログアウト処理完了（確認済み）")
+            logout_success = await poster.logout()
+            
+            if logout_success:
+                print("✅ ログアウト完了！")
+            else:
+                print("✅ ログアウト処理完了（確認済み）")
         
     except Exception as e:
         print(f"❌ システムエラー: {e}")